@@ -1,6 +1,7 @@
 from flask import Flask, jsonify, url_for
 from dotenv import load_dotenv
 import os
+import click
 from models import db
 from flask_marshmallow import Marshmallow
 from flask_migrate import Migrate
@@ -17,6 +18,18 @@ app = Flask(__name__) # location
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("SQLALCHEMY_DATABASE_URI")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = os.getenv('SQLALCHEMY_TRACK_MODIFICATIONS')
 
+# Connection pool - DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_POOL_TIMEOUT
+from utils.pool_metrics import engine_options, pool_metrics
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+
+# JSON responses - orjson when installed (JSON_BACKEND)
+from utils.serialization import init_json
+init_json(app)
+
+# Response caches - the per-process memory backend is refused with several workers (WEB_CONCURRENCY)
+from utils.cache import check_cache_backend
+check_cache_backend()
+
 # Set up JWT secret key
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
 
@@ -31,13 +44,22 @@ from schemas import ma
 ma.init_app(app)
 migrate = Migrate(app, db)
 
+# Per-request SQL statement counts, timings and query budget warnings
+from utils.query_stats import init_query_stats
+init_query_stats(app)
+
+# Count checkouts and connection churn on the pool
+with app.app_context():
+    pool_metrics.install(db.engine)
+
 # Import and register blueprints
 from routes.user_routes import user_bp
 from routes.order_routes import order_bp
 from routes.book_routes import book_bp
 from routes.address_routes import address_bp
-from routes.auth_routes import auth_bp
+from routes.auth_routes import auth_bp, token_required
 from routes.review_routes import review_bp
+from routes.export_routes import export_bp
 
 # Register each blueprint separately
 app.register_blueprint(user_bp)
@@ -46,6 +68,7 @@ app.register_blueprint(book_bp)
 app.register_blueprint(address_bp)
 app.register_blueprint(auth_bp, url_prefix='/auth')
 app.register_blueprint(review_bp)
+app.register_blueprint(export_bp)
 
 # Debug route to list all registered routes
 @app.route('/debug/routes')
@@ -59,6 +82,102 @@ def list_routes():
         })
     return jsonify(routes)
 
+# Debug route to inspect the shared schema registry (reflection counters per endpoint)
+@app.route('/debug/schema', methods=['GET'])
+def schema_stats():
+    from utils.schema_registry import schema_registry
+    return jsonify(schema_registry.stats())
+
+# Drop the cached reflected tables of the worker handling the request, e.g. after `flask db upgrade`
+# Development only (debug mode) - in production servers are restarted after a migration
+@app.route('/debug/schema/refresh', methods=['POST'])
+@token_required
+def refresh_schema(current_user):
+    if not app.debug:
+        return jsonify({"error": "Not found"}), 404
+    from utils.schema_registry import schema_registry
+    schema_registry.invalidate()
+    app.logger.info("Schema registry invalidated by user %s", current_user.id)
+    return jsonify({"message": "Schema registry invalidated"}), 200
+
+# CLI command to rebuild seller rating totals from the reviews table
+@app.cli.command('backfill-ratings')
+def backfill_ratings():
+    """Rebuild users.rating_sum/rating_count/rating from reviews"""
+    from utils.seller_stats import backfill_seller_ratings
+    updated = backfill_seller_ratings()
+    print(f"Rebuilt rating totals for {updated} users")
+
+# CLI command to cancel expired Pending/Unpaid orders and release their reserved books
+@app.cli.command('sweep-reservations')
+def sweep_reservations():
+    """Release reservations older than RESERVATION_TTL_MINUTES"""
+    from utils.reservation_sweeper import reservation_sweeper
+    orders, books = reservation_sweeper.sweep()
+    print(f"Cancelled {orders} expired orders, released {books} books")
+
+# CLI command to bulk import books from a CSV or NDJSON file
+@app.cli.command('import-books')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--seller-id', type=int, required=True, help='Seller the books are listed under')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']), default=None,
+              help='File format (default: from the file extension)')
+@click.option('--batch-size', type=int, default=None, help='Rows per INSERT batch (default BOOK_IMPORT_BATCH_SIZE)')
+def import_books(path, seller_id, file_format, batch_size):
+    """Import books, upserting on (seller_id, isbn)"""
+    from utils.book_import import BookImport, read_rows
+    from utils.text_search import book_search
+    from utils.cache import invalidate_book_caches, shares_invalidations
+    if file_format is None:
+        file_format = 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+    book_import = BookImport(seller_id, batch_size=batch_size)
+    try:
+        with open(path, 'rb') as stream:
+            report = book_import.run(read_rows(stream, file_format))
+    except Exception:
+        print(f"Import stopped after {book_import.imported} rows (committed batches are kept)")
+        raise
+    finally:
+        if book_import.imported:
+            book_search.invalidate()
+            invalidate_book_caches()
+            # The calls above only reach this command's process unless the state is shared
+            if not shares_invalidations():
+                print("Note: running servers keep their cached book pages until FEATURED_CACHE_TTL / "
+                      "SEARCH_CACHE_TTL expire (CACHE_BACKEND=redis shares invalidations)")
+            if book_search.backend.name == "memory":
+                print("Note: running servers' in-process search index misses the imported books until they restart")
+    print(f"Imported {report['imported']} of {report['rows']} rows in {report['batches']} batches, {report['failed']} failed")
+    for error in report['errors']:
+        print(f"  row {error['row']}: {'; '.join(error['errors'])}")
+
+# Debug route with the reservation sweeper metrics
+@app.route('/debug/sweeper', methods=['GET'])
+def sweeper_stats():
+    from utils.reservation_sweeper import reservation_sweeper
+    return jsonify(reservation_sweeper.stats())
+
+# Connection pool metrics
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({"db_pool": pool_metrics.snapshot()})
+
+# Debug route with response cache hit/miss counters
+@app.route('/debug/cache', methods=['GET'])
+def response_cache_stats():
+    from utils.cache import cache_stats
+    return jsonify(cache_stats())
+
+# Debug route with the prebuilt statement shapes and hit/miss counters
+@app.route('/debug/statements', methods=['GET'])
+def statement_stats():
+    from utils.statement_cache import statement_cache_stats
+    return jsonify(statement_cache_stats())
+
+# Background sweeper thread - only runs when RESERVATION_SWEEP_INTERVAL is set
+from utils.reservation_sweeper import reservation_sweeper
+reservation_sweeper.start(app)
+
 # Run the app
 if __name__ == "__main__":
     with app.app_context():
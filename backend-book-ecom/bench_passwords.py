@@ -0,0 +1,87 @@
+"""
+Password hashing benchmark: logins/sec per core for each hash cost.
+
+Verifies a password repeatedly on one thread (one core) for every method given,
+so the cost in PASSWORD_HASH_METHOD can be picked from measured numbers instead
+of guessed. With --threads it also runs the verifications concurrently through
+the bounded hashing pool to show how many are rejected with 429.
+
+Run this script with:
+python bench_passwords.py
+python bench_passwords.py --methods scrypt:16384:8:1 scrypt:32768:8:1 pbkdf2:sha256:600000
+python bench_passwords.py --threads 32 --workers 2 --queue 4
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+DEFAULT_METHODS = [
+    "scrypt:16384:8:1",
+    "scrypt:32768:8:1",
+    "pbkdf2:sha256:260000",
+    "pbkdf2:sha256:600000",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--methods", nargs="+", default=DEFAULT_METHODS, help="werkzeug hash methods to compare")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent per method")
+    parser.add_argument("--threads", type=int, default=0, help="concurrent login threads for the pool test")
+    parser.add_argument("--workers", type=int, default=2, help="PASSWORD_HASH_WORKERS for the pool test")
+    parser.add_argument("--queue", type=int, default=4, help="PASSWORD_HASH_QUEUE for the pool test")
+    return parser.parse_args()
+
+
+def logins_per_second(hasher, stored, seconds):
+    done = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        hasher.verify(stored, "benchmark")
+        done += 1
+    return done / (time.perf_counter() - started)
+
+
+def main():
+    args = parse_args()
+    from utils.passwords import PasswordHasher, HashingBusyError
+
+    print(f"Single thread, {os.cpu_count()} cores available")
+    for method in args.methods:
+        hasher = PasswordHasher(method=method, workers=0)
+        stored = hasher.hash("benchmark")
+        rate = logins_per_second(hasher, stored, args.seconds)
+        print(f"{method:>24}: {rate:8.1f} logins/sec/core  ({1000 / rate:.1f} ms per login)")
+
+    if args.threads:
+        hasher = PasswordHasher(method=args.methods[0], workers=args.workers, queue=args.queue)
+        stored = hasher.hash("benchmark")
+        outcomes = {"ok": 0, "busy": 0}
+        lock = threading.Lock()
+
+        def login():
+            try:
+                hasher.verify(stored, "benchmark")
+                result = "ok"
+            except HashingBusyError:
+                result = "busy"
+            with lock:
+                outcomes[result] += 1
+
+        threads = [threading.Thread(target=login) for _ in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        print(f"\n{args.threads} concurrent logins, {args.workers} workers + {args.queue} queued "
+              f"({args.methods[0]}): {outcomes['ok']} verified, {outcomes['busy']} rejected with 429 "
+              f"in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
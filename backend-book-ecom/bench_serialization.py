@@ -0,0 +1,115 @@
+"""
+Row serialization benchmark: getattr loop + jsonify vs row plans + the JSON_BACKEND encoder.
+
+Seeds a scratch database with books and orders, fetches 100-row pages and times
+turning them into a JSON response body:
+
+    - legacy: the old row_to_dict loop (getattr per column per row), dates and
+      Decimals left to the stdlib json encoder's default() hook
+    - plan + stdlib: utils/serialization.py row plans, stdlib json encoder
+    - plan + orjson: row plans, orjson encoder (when orjson is installed)
+
+Also checks that every path produces the same JSON document.
+
+Run this script with:
+python bench_serialization.py
+python bench_serialization.py --rows 100 --seconds 3
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100, help="rows per page")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent per path and table")
+    return parser.parse_args()
+
+
+def legacy_rows_to_list(rows, table):
+    """row_to_dict/rows_to_list as they were before the row plans"""
+    result = []
+    for row in rows:
+        record = {}
+        for column in table.columns:
+            record[column.name] = getattr(row, column.name)
+        result.append(record)
+    return result
+
+
+def pages_per_second(serialize, seconds):
+    done = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        serialize()
+        done += 1
+    return done / (time.perf_counter() - started)
+
+
+def main():
+    args = parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="serialization-bench-")
+    # app.py reads the URI at import time
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp_dir, 'serialization_bench.db')}"
+
+    from flask.json.provider import DefaultJSONProvider
+    from sqlalchemy import select
+    from app import app
+    from models import db, User, Book, Order
+    from utils.db_helpers import get_table
+    from utils.serialization import OrjsonProvider, orjson, row_plan
+
+    with app.app_context():
+        db.create_all()
+        seller = User(name="Bench", last_name="Seller", phone_number="000-000-0000",
+                      email="serialization-bench@example.com", password="x", is_seller=True)
+        db.session.add(seller)
+        db.session.flush()
+        db.session.add_all([
+            Book(title=f"Book {i}", author=f"Author {i}", price=5 + i % 90, genre="Fiction",
+                 condition="Good", description="A used book in good condition",
+                 publication_year=1900 + i % 120, status="Available", seller_id=seller.id)
+            for i in range(args.rows)
+        ])
+        db.session.add_all([
+            Order(user_id=seller.id, total_amount=10 + i, status="Pending", payment_status="Unpaid")
+            for i in range(args.rows)
+        ])
+        db.session.commit()
+
+    providers = {"stdlib": DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers["orjson"] = OrjsonProvider(app)
+    else:
+        print("orjson is not installed - skipping the orjson path")
+
+    with app.app_context():
+        for table_name in ("books", "orders"):
+            table = get_table(table_name)
+            rows = db.session.execute(select(table).limit(args.rows)).fetchall()
+            plan = row_plan(table)
+
+            paths = {"legacy": lambda: providers["stdlib"].dumps({"items": legacy_rows_to_list(rows, table)})}
+            for name, provider in providers.items():
+                paths[f"plan + {name}"] = lambda provider=provider: provider.dumps({"items": plan.rows(rows)})
+
+            documents = {name: json.loads(serialize()) for name, serialize in paths.items()}
+            same = all(document == documents["legacy"] for document in documents.values())
+
+            print(f"\n{table_name}: {len(rows)} rows x {len(table.columns)} columns per page"
+                  f"{'' if same else '  (OUTPUT DIFFERS)'}")
+            baseline = None
+            for name, serialize in paths.items():
+                rate = pages_per_second(serialize, args.seconds)
+                baseline = baseline or rate
+                print(f"  {name:>15}: {rate:8.1f} pages/sec  ({1e6 / rate:7.1f} us per page, {rate / baseline:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
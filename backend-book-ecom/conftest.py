@@ -0,0 +1,86 @@
+"""
+pytest setup: the app on a scratch SQLite database, seeded once per session,
+and the query_budget fixture from utils/pytest_query_budget.py.
+
+Run the tests from this directory with:
+pip install -r requirements-dev.txt
+python -m pytest
+"""
+import os
+import tempfile
+from datetime import datetime
+import pytest
+
+# app.py reads the URI at import time
+_tmp_dir = tempfile.mkdtemp(prefix="book-ecom-tests-")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(_tmp_dir, 'tests.db')}"
+
+pytest_plugins = ["utils.pytest_query_budget"]
+
+# Seeded rows - enough that a per-row query would blow any budget
+BUYERS = 12
+ORDERS_PER_BUYER = 10
+BOOKS_PER_ORDER = 3
+
+
+def _seed(db):
+    from models import User, Book, Order, Review, order_book
+
+    now = datetime.now()
+    seller_id = 1
+    buyer_ids = list(range(2, BUYERS + 2))
+    db.session.execute(User.__table__.insert(), [{
+        "id": user_id, "name": f"User{user_id}", "last_name": "Test", "phone_number": "000-000-0000",
+        "email": f"user{user_id}@example.com", "created_at": now, "password": None,
+        "is_seller": user_id == seller_id, "rating": None, "total_sales": 0
+    } for user_id in [seller_id] + buyer_ids])
+
+    books = BUYERS * ORDERS_PER_BUYER * BOOKS_PER_ORDER
+    db.session.execute(Book.__table__.insert(), [{
+        "id": book_id, "title": f"Book {book_id}", "author": "Author", "price": 10,
+        "condition": "Good", "status": "Reserved", "seller_id": seller_id
+    } for book_id in range(1, books + 1)])
+
+    # Every buyer reviews book 1, so GET /books/1/reviews embeds a different buyer per review
+    db.session.execute(Review.__table__.insert(), [{
+        "rating": 4, "comment": "Fine", "seller_id": seller_id, "buyer_id": buyer_id, "book_id": 1
+    } for buyer_id in buyer_ids])
+
+    orders = []
+    line_items = []
+    order_id = 0
+    for buyer_id in buyer_ids:
+        for _ in range(ORDERS_PER_BUYER):
+            order_id += 1
+            orders.append({
+                "id": order_id, "user_id": buyer_id, "total_amount": 10 * BOOKS_PER_ORDER,
+                "status": "Pending", "payment_status": "Unpaid", "order_date": now, "created_at": now
+            })
+            line_items.extend({
+                "order_id": order_id, "book_id": (order_id - 1) * BOOKS_PER_ORDER + n + 1, "unit_price": 10
+            } for n in range(BOOKS_PER_ORDER))
+    db.session.execute(Order.__table__.insert(), orders)
+    db.session.execute(order_book.insert(), line_items)
+    db.session.commit()
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.create_all()
+        _seed(db)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seed():
+    """Sizes of the seeded data"""
+    return {"buyers": BUYERS, "orders_per_buyer": ORDERS_PER_BUYER, "books_per_order": BOOKS_PER_ORDER}
@@ -0,0 +1,35 @@
+"""Books fulltext index
+
+Revision ID: 3f1c9a7d2b64
+Revises: 9cfa65662de0
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b64'
+down_revision = '9cfa65662de0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FULLTEXT only exists on MySQL - other databases use the in-process search index
+    if op.get_bind().dialect.name != 'mysql':
+        return
+
+    op.create_index(
+        'ix_books_fulltext', 'books',
+        ['title', 'author', 'genre', 'description'],
+        mysql_prefix='FULLTEXT'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+
+    op.drop_index('ix_books_fulltext', table_name='books')
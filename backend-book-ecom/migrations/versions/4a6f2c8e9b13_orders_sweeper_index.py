@@ -0,0 +1,26 @@
+"""Orders sweeper index
+
+Revision ID: 4a6f2c8e9b13
+Revises: e91d3b6a5f08
+Create Date: 2026-10-18 13:05:32.871146
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a6f2c8e9b13'
+down_revision = 'e91d3b6a5f08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_status_payment_created', ['status', 'payment_status', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_status_payment_created')
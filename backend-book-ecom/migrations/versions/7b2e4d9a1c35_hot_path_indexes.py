@@ -0,0 +1,64 @@
+"""Hot path indexes
+
+Revision ID: 7b2e4d9a1c35
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-18 11:02:17.540918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e4d9a1c35'
+down_revision = '3f1c9a7d2b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.create_index('ix_books_status_id', ['status', 'id'], unique=False)
+        batch_op.create_index('ix_books_seller_id', ['seller_id'], unique=False)
+        batch_op.create_index('ix_books_genre_price', ['genre', 'price'], unique=False)
+        batch_op.create_index('ix_books_price', ['price'], unique=False)
+        batch_op.create_index('ix_books_publication_year', ['publication_year'], unique=False)
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_user_id_order_date', ['user_id', 'order_date'], unique=False)
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index('ix_reviews_seller_id', ['seller_id'], unique=False)
+        batch_op.create_index('ix_reviews_book_id', ['book_id'], unique=False)
+        batch_op.create_index('ix_reviews_buyer_id_seller_id', ['buyer_id', 'seller_id'], unique=False)
+
+    with op.batch_alter_table('addresses', schema=None) as batch_op:
+        batch_op.create_index('ix_addresses_user_id_is_default', ['user_id', 'is_default'], unique=False)
+
+    with op.batch_alter_table('order_book', schema=None) as batch_op:
+        batch_op.create_index('ix_order_book_order_id_book_id', ['order_id', 'book_id'], unique=False)
+        batch_op.create_index('ix_order_book_book_id', ['book_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('order_book', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_book_book_id')
+        batch_op.drop_index('ix_order_book_order_id_book_id')
+
+    with op.batch_alter_table('addresses', schema=None) as batch_op:
+        batch_op.drop_index('ix_addresses_user_id_is_default')
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_reviews_buyer_id_seller_id')
+        batch_op.drop_index('ix_reviews_book_id')
+        batch_op.drop_index('ix_reviews_seller_id')
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_user_id_order_date')
+
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_index('ix_books_publication_year')
+        batch_op.drop_index('ix_books_price')
+        batch_op.drop_index('ix_books_genre_price')
+        batch_op.drop_index('ix_books_seller_id')
+        batch_op.drop_index('ix_books_status_id')
@@ -0,0 +1,27 @@
+"""Unique seller/ISBN index for bulk imports
+
+Revision ID: a7c3e9d5f248
+Revises: f3a9c6e2d175
+Create Date: 2026-10-18 17:24:09.118437
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9d5f248'
+down_revision = 'f3a9c6e2d175'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fails if a seller already lists the same ISBN twice - merge those listings first
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.create_index('ux_books_seller_id_isbn', ['seller_id', 'isbn'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_index('ux_books_seller_id_isbn')
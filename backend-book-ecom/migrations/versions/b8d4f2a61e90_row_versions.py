@@ -0,0 +1,37 @@
+"""Row versions for conditional requests
+
+Revision ID: b8d4f2a61e90
+Revises: 4a6f2c8e9b13
+Create Date: 2026-10-18 14:21:07.530918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4f2a61e90'
+down_revision = '4a6f2c8e9b13'
+branch_labels = None
+depends_on = None
+
+TABLES = ('books', 'orders', 'users', 'reviews', 'addresses')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(
+                'updated_at',
+                sa.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql'),
+                nullable=True
+            ))
+        # Existing rows start at the migration time
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,38 @@
+"""Seller rating totals
+
+Revision ID: c5a8e1f04d27
+Revises: 7b2e4d9a1c35
+Create Date: 2026-10-18 11:48:55.102437
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a8e1f04d27'
+down_revision = '7b2e4d9a1c35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill the totals from existing reviews
+    op.execute(
+        "UPDATE users SET "
+        "rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE reviews.seller_id = users.id), "
+        "rating_count = (SELECT COUNT(*) FROM reviews WHERE reviews.seller_id = users.id)"
+    )
+    op.execute(
+        "UPDATE users SET rating = rating_sum * 1.0 / rating_count WHERE rating_count > 0"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('rating_count')
+        batch_op.drop_column('rating_sum')
@@ -0,0 +1,26 @@
+"""User token version
+
+Revision ID: d2e7a5c91f36
+Revises: b8d4f2a61e90
+Create Date: 2026-10-18 15:02:44.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2e7a5c91f36'
+down_revision = 'b8d4f2a61e90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('token_version')
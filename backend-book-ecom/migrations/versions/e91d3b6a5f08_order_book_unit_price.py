@@ -0,0 +1,32 @@
+"""Order book unit price
+
+Revision ID: e91d3b6a5f08
+Revises: c5a8e1f04d27
+Create Date: 2026-10-18 12:21:09.664310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91d3b6a5f08'
+down_revision = 'c5a8e1f04d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('order_book', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unit_price', sa.Numeric(precision=10, scale=2), nullable=True))
+
+    # Existing orders get the current book price as their snapshot
+    op.execute(
+        "UPDATE order_book SET unit_price = "
+        "(SELECT price FROM books WHERE books.id = order_book.book_id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('order_book', schema=None) as batch_op:
+        batch_op.drop_column('unit_price')
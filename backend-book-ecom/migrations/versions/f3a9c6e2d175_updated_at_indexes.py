@@ -0,0 +1,30 @@
+"""Updated at indexes for incremental exports
+
+Revision ID: f3a9c6e2d175
+Revises: d2e7a5c91f36
+Create Date: 2026-10-18 16:10:53.406721
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c6e2d175'
+down_revision = 'd2e7a5c91f36'
+branch_labels = None
+depends_on = None
+
+TABLES = ('books', 'orders', 'reviews')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(f'ix_{table}_updated_at', ['updated_at'], unique=False)
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_updated_at')
@@ -1,7 +1,8 @@
-from sqlalchemy import Integer, String, ForeignKey, Boolean
+from sqlalchemy import Integer, String, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from typing import Optional
-from .base import Base
+from .base import Base, updated_at_column
+from datetime import datetime
 from .user_model import User
 from enum import Enum
 from sqlalchemy import Enum as SQLAlchemyEnum
@@ -36,6 +37,8 @@ class Address(Base):
     #address_type: Mapped[Optional[str]] = mapped_column(String(50))
     # This prevents invalid data from being saved in database
     address_type: Mapped[Optional[AddressType]] = mapped_column(SQLAlchemyEnum(AddressType), nullable=True)
+    # Last change - drives ETag / Last-Modified
+    updated_at: Mapped[Optional[datetime]] = updated_at_column()
     
     # Relationships -> Many-to-One
     # ForeignKey linking Address to User - each address must belong to a user
@@ -45,6 +48,11 @@ class Address(Base):
     # This creates bidirectional relationship with user model's addresses field
     # One user can have Many addresses, but each address belongs to One user
     user: Mapped[Optional["User"]] = relationship(back_populates="addresses", lazy="noload")
+
+    __table_args__ = (
+        # User address lists and default address lookups
+        Index('ix_addresses_user_id_is_default', 'user_id', 'is_default'),
+    )
     
 #? Method to set this address as default and unset others
 # # Method to set this address as default and unset others
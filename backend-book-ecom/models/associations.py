@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, ForeignKey
+from sqlalchemy import Table, Column, ForeignKey, Index, Numeric
 from .base import Base
 
 # Junction table for Order-Book many-to-many relationship.
@@ -14,6 +14,12 @@ order_book = Table(
     "order_book",
     Base.metadata,
     Column("order_id", ForeignKey("orders.id")),
-    Column("book_id", ForeignKey("books.id"))
+    Column("book_id", ForeignKey("books.id")),
+    # Book price when the order was placed - later price changes don't affect the order
+    Column("unit_price", Numeric(10, 2), nullable=True),
+    # Books of an order (order pages, user order history)
+    Index("ix_order_book_order_id_book_id", "order_id", "book_id"),
+    # Orders containing a book (book deletion)
+    Index("ix_order_book_book_id", "book_id")
 )
 
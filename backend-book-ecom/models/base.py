@@ -1,10 +1,21 @@
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy import DateTime
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import DeclarativeBase, mapped_column
+from datetime import datetime
 
 # Base model for sonsit model behaviour
 class Base(DeclarativeBase):
 
     pass
 
+# Row version used for ETag / Last-Modified.
+# Microsecond precision so two updates in the same second still differ
+UpdatedAt = DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
+
+def updated_at_column():
+    """Timestamp set on insert and on every UPDATE (ORM and Core)"""
+    return mapped_column(UpdatedAt, nullable=True, default=datetime.now, onupdate=datetime.now)
+
 # User -> Books (One-to-Many)
 # User -> Orders (One-to-Many)
 # User -> Addresses (One-to-Many)
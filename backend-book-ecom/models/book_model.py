@@ -1,8 +1,8 @@
-from sqlalchemy import Integer, String, ForeignKey, Enum, CheckConstraint
+from sqlalchemy import Integer, String, ForeignKey, Enum, CheckConstraint, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from typing import List, Optional
 from datetime import datetime
-from .base import Base 
+from .base import Base, updated_at_column
 from .user_model import User
 # Remove circular imports
 # from .order_model import Order
@@ -43,6 +43,9 @@ class Book(Base):
     # Stores URL or path to book cover image
     image_url: Mapped[Optional[str]] = mapped_column(String(255))
     
+    # Last change - drives ETag / Last-Modified
+    updated_at: Mapped[Optional[datetime]] = updated_at_column()
+    
     # Relationships -> Many-to-One with Seller
     # Each book must have One seller
     seller_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -67,6 +70,24 @@ class Book(Base):
             'publication_year >= 1800 AND publication_year <= 2100',
             name='check_publication_year'
         ),
+        # Secondary indexes for the hot filter/sort paths
+        # featured books: WHERE status = 'Available' ORDER BY id DESC
+        Index('ix_books_status_id', 'status', 'id'),
+        # seller listings and seller ownership checks
+        Index('ix_books_seller_id', 'seller_id'),
+        # One listing per ISBN per seller - bulk imports upsert on it (NULL ISBNs never clash)
+        Index('ux_books_seller_id_isbn', 'seller_id', 'isbn', unique=True),
+        # search filters / sorts
+        Index('ix_books_genre_price', 'genre', 'price'),
+        Index('ix_books_price', 'price'),
+        Index('ix_books_publication_year', 'publication_year'),
+        # Incremental exports: GET /export/books?since=
+        Index('ix_books_updated_at', 'updated_at'),
+        # Full-text search over the text fields (MySQL only - other databases use utils/text_search.py's in-process index)
+        Index(
+            'ix_books_fulltext', 'title', 'author', 'genre', 'description',
+            mysql_prefix='FULLTEXT'
+        ).ddl_if(dialect='mysql'),
     )
 
     # Methods
@@ -1,9 +1,9 @@
-from sqlalchemy import Integer, String, ForeignKey, DateTime, Enum, CheckConstraint
+from sqlalchemy import Integer, String, ForeignKey, DateTime, Enum, CheckConstraint, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from typing import List, Optional
 from datetime import datetime
 from sqlalchemy.sql import func
-from .base import Base
+from .base import Base, updated_at_column
 from .user_model import User
 from .address_model import Address
 from decimal import Decimal
@@ -32,6 +32,8 @@ class Order(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     order_date: Mapped[datetime] = mapped_column(DateTime, default=func.now())
     created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())    
+    # Last change - drives ETag / Last-Modified
+    updated_at: Mapped[Optional[datetime]] = updated_at_column()
     
     # Order Details and Status
     #! total_amount is required and must be calculated before saving order
@@ -78,6 +80,12 @@ class Order(Base):
     __table_args__ = (
         # Ensure total_amount is not negative
         CheckConstraint('total_amount >= 0', name='check_positive_amount'),
+        # User order history: WHERE user_id = ? ORDER BY order_date DESC
+        Index('ix_orders_user_id_order_date', 'user_id', 'order_date'),
+        # Reservation sweeper: expired Pending/Unpaid orders, oldest first
+        Index('ix_orders_status_payment_created', 'status', 'payment_status', 'created_at'),
+        # Incremental exports: GET /export/orders?since=
+        Index('ix_orders_updated_at', 'updated_at'),
     )
 
     # Method to update order status
@@ -1,9 +1,9 @@
-from sqlalchemy import Integer, String, ForeignKey, DateTime
+from sqlalchemy import Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from typing import Optional
 from datetime import datetime
 from sqlalchemy.sql import func
-from .base import Base
+from .base import Base, updated_at_column
 from .user_model import User
 # Remove circular imports
 # from .book_model import Book
@@ -31,6 +31,8 @@ class Review(Base):
     rating: Mapped[int] = mapped_column(nullable=False)
     comment: Mapped[Optional[str]] = mapped_column(String(500))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    # Last change - drives ETag / Last-Modified
+    updated_at: Mapped[Optional[datetime]] = updated_at_column()
     
     # Foreign Keys
     
@@ -88,4 +90,15 @@ class Review(Base):
     order: Mapped["Order"] = relationship(
         foreign_keys=[order_id],
         lazy="noload"
+    )
+
+    __table_args__ = (
+        # Reviews received by a seller (listing + rating aggregates)
+        Index('ix_reviews_seller_id', 'seller_id'),
+        # Reviews of a book
+        Index('ix_reviews_book_id', 'book_id'),
+        # Reviews written by a buyer + the one-review-per-seller check
+        Index('ix_reviews_buyer_id_seller_id', 'buyer_id', 'seller_id'),
+        # Incremental exports: GET /export/reviews?since=
+        Index('ix_reviews_updated_at', 'updated_at'),
     )
\ No newline at end of file
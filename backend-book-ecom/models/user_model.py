@@ -1,10 +1,10 @@
 from sqlalchemy import String, DateTime, Boolean
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.passwords import password_hasher
 from typing import List, Optional
 from datetime import datetime
 from sqlalchemy.sql import func
-from .base import Base
+from .base import Base, updated_at_column
 
 class User(Base):
     """
@@ -25,11 +25,19 @@ class User(Base):
     phone_number: Mapped[str] = mapped_column(String(15), nullable=False)
     email: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=func.now())
+    # Last change - drives ETag / Last-Modified
+    updated_at: Mapped[Optional[datetime]] = updated_at_column()
     password: Mapped[str] = mapped_column(String(255), nullable=True)
     # Seller profile fields 
     is_seller: Mapped[bool] = mapped_column(Boolean, default=False)
     rating: Mapped[Optional[float]] = mapped_column(nullable=True)
+    # Running totals of received review ratings - rating is rating_sum / rating_count
+    # Kept up to date by utils/seller_stats.py so reviews never need to be rescanned
+    rating_sum: Mapped[int] = mapped_column(nullable=False, default=0, server_default='0')
+    rating_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default='0')
     total_sales: Mapped[int] = mapped_column(nullable=False, default=0)
+    # Bumped to revoke every JWT issued so far (tokens carry it as the `ver` claim)
+    token_version: Mapped[int] = mapped_column(nullable=False, default=0, server_default='0')
 
     # Relationships:
     
@@ -72,7 +80,7 @@ class User(Base):
         If no password provided, sets it to None
         """
         if password:
-            self.password = generate_password_hash(password)
+            self.password = password_hasher.hash(password)
         else:
             self.password = None  # set to None if no password
         
@@ -84,6 +92,6 @@ class User(Base):
         """
         if password is None:
             return False
-        return check_password_hash(self.password, password)
+        return password_hasher.verify(self.password, password)
 
 
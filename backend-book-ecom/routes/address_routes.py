@@ -4,9 +4,10 @@ from sqlalchemy import select, insert, update, delete, Table, MetaData
 from schemas.address_schema import address_schema, addresses_schema
 from models import db, Address
 from utils.db_helpers import (
-    get_table, row_to_dict, rows_to_list, paginate_results,
+    get_table, row_to_dict, rows_to_list, paginate_query,
     handle_error, execute_query, get_by_id, create_record
 )
+from utils.http_cache import conditional_json, list_etag
 
 address_bp = Blueprint('address', __name__)
 
@@ -30,27 +31,26 @@ def get_addresses():
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
+        count = request.args.get('count', 'exact', type=str)
         
         # Use direct SQL approach to avoid loading relationships
         addresses_table = get_table('addresses')
         
         # Build the query
-        query = select(addresses_table)
-        
-        # Execute query
-        addresses = execute_query(query)
-        
-        # Convert to list of dictionaries
-        address_list = rows_to_list(addresses, addresses_table)
-        
-        # Paginate results
-        paginated_addresses = paginate_results(address_list, page, limit)
-        
-        return jsonify({
-            "page": page,
-            "total": len(address_list),
-            "addresses": paginated_addresses
-        }), 200
+        query = select(addresses_table).order_by(addresses_table.c.id)
+        
+        # Fetch only the requested page, total comes from COUNT(*)
+        addresses, total = paginate_query(query, page, limit, count)
+        
+        # 304 if the client already has this page
+        return conditional_json(
+            lambda: {
+                "page": page,
+                "total": total,
+                "addresses": rows_to_list(addresses, addresses_table)
+            },
+            list_etag('addresses', addresses, total)
+        )
         
     except Exception as e:
         return handle_error(e, "getting addresses")
@@ -61,27 +61,28 @@ def get_user_addresses(user_id):
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
+        count = request.args.get('count', 'exact', type=str)
         
         # Use direct SQL approach to avoid loading relationships
         addresses_table = get_table('addresses')
         
         # Build the query to get addresses for a specific user
-        query = select(addresses_table).where(addresses_table.c.user_id == user_id)
-        
-        # Execute query
-        addresses = execute_query(query)
-        
-        # Convert to list of dictionaries
-        address_list = rows_to_list(addresses, addresses_table)
-        
-        # Paginate results
-        paginated_addresses = paginate_results(address_list, page, limit)
-        
-        return jsonify({
-            "page": page,
-            "total": len(address_list),
-            "addresses": paginated_addresses
-        }), 200
+        query = select(addresses_table).where(
+            addresses_table.c.user_id == user_id
+        ).order_by(addresses_table.c.id)
+        
+        # Fetch only the requested page, total comes from COUNT(*)
+        addresses, total = paginate_query(query, page, limit, count)
+        
+        # 304 if the client already has this page
+        return conditional_json(
+            lambda: {
+                "page": page,
+                "total": total,
+                "addresses": rows_to_list(addresses, addresses_table)
+            },
+            list_etag('addresses', addresses, total)
+        )
         
     except Exception as e:
         return handle_error(e, f"getting addresses for user {user_id}")
@@ -105,7 +106,7 @@ def update_address(id):
         # Prepare update data from request
         update_data = {}
         for key, value in request.json.items():
-            if hasattr(addresses_table.c, key):
+            if hasattr(addresses_table.c, key) and key != 'updated_at':
                 update_data[key] = value
         
         # Update the address
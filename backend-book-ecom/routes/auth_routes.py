@@ -1,5 +1,4 @@
 from flask import request, jsonify, Blueprint, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
 from models import db
 from models.user_model import User
 from schemas.user_schema import user_schema
@@ -10,10 +9,77 @@ from functools import wraps
 from utils.db_helpers import (
     get_table, row_to_dict, handle_error, execute_query
 )
-from sqlalchemy import select
+from sqlalchemy import select, update
+from utils.token_versions import token_versions
+from utils.passwords import password_hasher, HashingBusyError
+import os
 
 auth_bp = Blueprint('auth', __name__)
 
+# 'stateless' trusts the token claims (plus a cached token version check),
+# 'db' loads the User row on every authenticated request
+AUTH_MODE = os.getenv('AUTH_MODE', 'stateless')
+
+def generate_token(user_id, is_seller, token_version, hours=24):
+    """Signed JWT with the claims token_required needs to skip the User lookup"""
+    return jwt.encode({
+        'user_id': user_id,
+        'is_seller': bool(is_seller),
+        'ver': token_version or 0,
+        'exp': datetime.utcnow() + timedelta(hours=hours)
+    }, current_app.config['SECRET_KEY'], algorithm="HS256")
+
+# Public profile returned by login - built straight from the login row
+LOGIN_PROFILE_FIELDS = (
+    'id', 'name', 'last_name', 'email', 'phone_number',
+    'is_seller', 'rating', 'total_sales', 'created_at', 'updated_at'
+)
+
+def login_profile(row):
+    """Compact profile payload (same field formats as user_schema, no relationships)"""
+    profile = {name: getattr(row, name) for name in LOGIN_PROFILE_FIELDS}
+    for name in ('created_at', 'updated_at'):
+        if profile[name] is not None:
+            profile[name] = profile[name].isoformat()
+    return profile
+
+def busy_response(error):
+    """429 while the password hashing pool is saturated"""
+    response = jsonify({'message': str(error)})
+    response.headers['Retry-After'] = '1'
+    return response, 429
+
+class CurrentUser:
+    """
+    Authenticated user built from token claims.
+    id and is_seller come from the token; any other attribute loads the User row on first access.
+    """
+    def __init__(self, user_id, is_seller=None, token_version=0):
+        self.id = user_id
+        self.token_version = token_version
+        self._is_seller = is_seller
+        self._user = None
+    
+    @property
+    def user(self):
+        """The User model instance (loaded lazily, once per request)"""
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+    
+    @property
+    def is_seller(self):
+        # Tokens issued before the claim existed fall back to the database
+        if self._is_seller is None:
+            return self.user.is_seller
+        return self._is_seller
+    
+    def __getattr__(self, name):
+        # Only called for attributes not set above
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
 # JWT token required decorator
 def token_required(f):
     @wraps(f)
@@ -38,7 +104,16 @@ def token_required(f):
                 current_app.config['SECRET_KEY'], 
                 algorithms=["HS256"]
             )
-            current_user = db.session.get(User, data['user_id'])
+            
+            if AUTH_MODE == 'db':
+                current_user = db.session.get(User, data['user_id'])
+                if current_user is None or current_user.token_version != data.get('ver', 0):
+                    return jsonify({'message': 'Token has been revoked'}), 401
+            else:
+                # Revoked tokens carry an old version; the version lookup is cached
+                if token_versions.get(data['user_id']) != data.get('ver', 0):
+                    return jsonify({'message': 'Token has been revoked'}), 401
+                current_user = CurrentUser(data['user_id'], data.get('is_seller'), data.get('ver', 0))
         except jwt.ExpiredSignatureError:
             return jsonify({'message': 'Token has expired'}), 401
         except (jwt.InvalidTokenError, Exception) as e:
@@ -99,7 +174,7 @@ def register():
             last_name=last_name,
             email=email,
             phone_number=phone_number,
-            password=generate_password_hash(password) if password else None,
+            password=password_hasher.hash(password) if password else None,
             is_seller=is_seller
         )
         
@@ -116,6 +191,9 @@ def register():
     except ValidationError as err:
         print(f"Validation error: {err.messages}")
         return jsonify(err.messages), 400
+    except HashingBusyError as he:
+        db.session.rollback()
+        return busy_response(he)
     except Exception as e:
         print(f"Registration error details: {str(e)}")
         import traceback
@@ -134,34 +212,45 @@ def login():
         # Get users table
         users_table = get_table('users')
         
-        # Query user by email
-        user_query = select(users_table).where(users_table.c.email == auth.get('email'))
-        user_row = execute_query(user_query, single_result=True)
+        # One lookup on the unique email index, only the columns login needs
+        user_query = select(
+            users_table.c.password,
+            users_table.c.token_version,
+            *[users_table.c[name] for name in LOGIN_PROFILE_FIELDS]
+        ).where(users_table.c.email == auth.get('email'))
+        user_row = db.session.execute(user_query).first()
         
         if not user_row:
             return jsonify({'message': 'User not found'}), 404
-        
-        # Convert to User object for password verification
-        user = db.session.get(User, user_row.id)
             
-        if not user.password:  # Guest user without password
+        if not user_row.password:  # Guest user without password
             return jsonify({'message': 'Account requires password setup'}), 403
             
-        if not check_password_hash(user.password, auth.get('password')):
+        if not password_hasher.verify(user_row.password, auth.get('password')):
             return jsonify({'message': 'Incorrect password'}), 401
+        
+        # Upgrade hashes made with an older method/cost while we have the plain password
+        if password_hasher.needs_rehash(user_row.password):
+            db.session.execute(
+                update(users_table).where(users_table.c.id == user_row.id).values(
+                    password=password_hasher.hash(auth.get('password'))
+                )
+            )
+            db.session.commit()
+            password_hasher.record_rehash()
             
         # Generate JWT token
-        token = jwt.encode({
-            'user_id': user.id,
-            'exp': datetime.utcnow() + timedelta(hours=24)
-        }, current_app.config['SECRET_KEY'], algorithm="HS256")
+        token = generate_token(user_row.id, user_row.is_seller, user_row.token_version)
         
         return jsonify({
             'message': 'Login successful',
             'token': token,
-            'user': user_schema.dump(user)
+            'user': login_profile(user_row)
         }), 200
         
+    except HashingBusyError as he:
+        db.session.rollback()
+        return busy_response(he)
     except Exception as e:
         return handle_error(e, "logging in")
 
@@ -169,11 +258,8 @@ def login():
 @token_required
 def refresh_token(current_user):
     try:
-        # Generate new JWT token
-        token = jwt.encode({
-            'user_id': current_user.id,
-            'exp': datetime.utcnow() + timedelta(hours=24)
-        }, current_app.config['SECRET_KEY'], algorithm="HS256")
+        # Generate new JWT token - same claims, no database access needed
+        token = generate_token(current_user.id, current_user.is_seller, current_user.token_version)
         
         return jsonify({
             'message': 'Token refreshed',
@@ -187,10 +273,26 @@ def refresh_token(current_user):
 @token_required
 def get_me(current_user):
     try:
-        return jsonify(user_schema.dump(current_user)), 200
+        user = current_user.user if isinstance(current_user, CurrentUser) else current_user
+        return jsonify(user_schema.dump(user)), 200
     except Exception as e:
         return jsonify({'message': 'Failed to get user info', 'error': str(e)}), 500
 
+# Log out everywhere - every token issued so far stops working
+@auth_bp.route('/revoke', methods=['POST'])
+@token_required
+def revoke_tokens(current_user):
+    try:
+        token_versions.bump(current_user.id)
+        db.session.commit()
+        token_versions.forget(current_user.id)
+        
+        return jsonify({'message': 'All tokens revoked'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Token revocation failed', 'error': str(e)}), 500
+
 @auth_bp.route('/reset-password', methods=['POST'])
 def request_password_reset():
     try:
@@ -249,12 +351,17 @@ def reset_password(token):
         if not user:
             return jsonify({'message': 'User not found'}), 404
             
-        # Update password
-        user.password = generate_password_hash(data['password'])
+        # Update password and revoke the tokens issued with the old one
+        user.password = password_hasher.hash(data['password'])
+        token_versions.bump(user.id)
         db.session.commit()
+        token_versions.forget(user.id)
         
         return jsonify({'message': 'Password reset successful'}), 200
         
+    except HashingBusyError as he:
+        db.session.rollback()
+        return busy_response(he)
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Password reset failed', 'error': str(e)}), 500 
\ No newline at end of file
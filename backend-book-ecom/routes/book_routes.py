@@ -1,6 +1,7 @@
 from flask import request, jsonify, Blueprint, current_app
 from marshmallow import ValidationError
-from sqlalchemy import select, or_, and_, desc, text, update, delete
+from sqlalchemy import select, or_, and_, desc, text, update, delete, bindparam
+from sqlalchemy.exc import IntegrityError
 from schemas.book_schema import book_schema, books_schema
 from models import db
 from models.book_model import Book
@@ -9,14 +10,60 @@ from werkzeug.utils import secure_filename
 from routes.auth_routes import token_required
 import os
 import uuid
+import json
 from sqlalchemy import Table, Column, MetaData, insert
 from utils.db_helpers import (
-    get_table, row_to_dict, rows_to_list, paginate_results, 
+    get_table, row_to_dict, rows_to_list, paginate_query,
+    keyset_paginate, count_query, paginate_prepared,
     handle_error, execute_query, get_by_id, create_record
 )
+from utils.text_search import book_search, tokenize, SearchTooBroadError
+from utils.cache import featured_books_cache, search_results_cache, invalidate_book_caches
+from utils.http_cache import conditional_json, list_etag, records_etag
+from utils.statement_cache import statement_cache, paged_statements
+from utils.book_import import BookImport, read_rows
+from utils.bulk_update import (
+    patch_values, filter_conditions, parse_updates, per_book_values,
+    bulk_update_statement, touches_search_fields
+)
 
 book_bp = Blueprint('book', __name__)
 
+# Searches with a bigger page size skip the result cache
+SEARCH_CACHE_MAX_LIMIT = int(os.getenv('SEARCH_CACHE_MAX_LIMIT', 100))
+
+# Prebuilt list/search statements, one per query shape
+_list_statements = statement_cache('list_books')
+_search_statements = statement_cache('search_books')
+
+
+def _is_seller(user_id):
+    """Current seller flag from the database - bulk writes don't trust the one in the token"""
+    users_table = get_table('users')
+    return bool(db.session.execute(
+        select(users_table.c.is_seller).where(users_table.c.id == user_id)
+    ).scalar())
+
+
+def _isbn_conflict(seller_id, isbn, book_id=None):
+    """409 response when the seller already lists another book with this ISBN (ux_books_seller_id_isbn), else None"""
+    if not isbn:
+        return None
+    books_table = get_table('books')
+    query = select(books_table.c.id).where(
+        books_table.c.seller_id == seller_id,
+        books_table.c.isbn == isbn
+    )
+    if book_id is not None:
+        query = query.where(books_table.c.id != book_id)
+    existing_id = db.session.execute(query.limit(1)).scalar()
+    if existing_id is None:
+        return None
+    return jsonify({
+        "error": f"Seller already lists a book with ISBN {isbn}",
+        "book_id": existing_id
+    }), 409
+
 @book_bp.route('/books', methods=['POST'])
 # @token_required  # Temporarily commented out for development
 def create_book():  # Removed current_user parameter
@@ -57,14 +104,151 @@ def create_book():  # Removed current_user parameter
             insert_data['image_url'] = book_data['image_url']
             
         # Create the book using our helper function
-        return create_record('books', insert_data)
+        response, status = create_record('books', insert_data)
+        
+        # Add the new book to the text search index
+        if status == 201:
+            book_search.refresh(get_table('books'), response.get_json()['books']['id'])
+            invalidate_book_caches()
+        
+        return response, status
             
     except ValidationError as err:
         print(f"Validation error: {err.messages}")
         return jsonify(err.messages), 400
+    except IntegrityError as e:
+        # create_record rolled back - a duplicate ISBN for this seller, or a value breaking a book constraint
+        print(f"Book insert rejected: {str(e)}")
+        conflict = _isbn_conflict(insert_data['seller_id'], insert_data.get('isbn'))
+        if conflict:
+            return conflict
+        return jsonify({"error": "Book violates a book constraint"}), 400
     except Exception as e:
         return handle_error(e, "creating book")
 
+@book_bp.route('/books/import', methods=['POST'])
+@token_required
+def import_books(current_user):
+    """
+    Bulk import books from CSV or NDJSON into the current seller's listings.
+    Send the file as multipart form field 'file' or as the raw request body.
+    Query params: format=csv|ndjson (default from the file name), batch_size
+    """
+    try:
+        # Rows are upserted on (seller_id, isbn) - only a seller may import, and only into their own listings
+        if not _is_seller(current_user.id):
+            return jsonify({"error": "Only sellers can import books"}), 403
+        seller_id = current_user.id
+
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        filename = upload.filename if upload else ''
+
+        file_format = request.args.get('format', type=str)
+        if not file_format:
+            file_format = 'ndjson' if filename.endswith(('.ndjson', '.jsonl')) else 'csv'
+        if file_format not in ('csv', 'ndjson'):
+            return jsonify({"error": "format must be csv or ndjson"}), 400
+
+        batch_size = request.args.get('batch_size', type=int)
+        if batch_size is not None and batch_size < 1:
+            return jsonify({"error": "batch_size must be positive"}), 400
+
+        print(f"Importing {file_format} books for seller {seller_id}")
+        book_import = BookImport(seller_id, batch_size=batch_size)
+        try:
+            report = book_import.run(read_rows(stream, file_format))
+        except Exception as e:
+            # Batches before the failing one are committed - report them along with the error
+            print(f"Book import stopped after {book_import.imported} rows: {str(e)}")
+            return jsonify(dict(book_import.report(), error=f"Import stopped: {str(e)}")), 500
+        finally:
+            if book_import.imported:
+                # Many rows changed at once - rebuild the search index lazily
+                book_search.invalidate()
+                invalidate_book_caches()
+        print(f"Book import done: {report['imported']} imported, {report['failed']} failed")
+
+        return jsonify(report), 200 if report['imported'] or not report['failed'] else 400
+
+    except Exception as e:
+        return handle_error(e, "importing books")
+
+@book_bp.route('/books/bulk', methods=['PATCH'])
+@token_required
+def bulk_update_books(current_user):
+    """
+    Update many of the current seller's books in one transaction.
+    Body: {"updates": [{"id": 1, "fields": {...}}, ...]}
+       or {"filter": {"condition": "Good"}, "patch": {"price": {"multiply": 0.9}}}
+    Add "returning": true to get the updated books back (databases with UPDATE ... RETURNING).
+    """
+    try:
+        if not _is_seller(current_user.id):
+            return jsonify({"error": "Only sellers can update books"}), 403
+
+        data = request.get_json(silent=True) or {}
+        books_table = get_table('books')
+
+        if 'updates' in data:
+            changes, errors = parse_updates(data['updates'])
+            if errors:
+                return jsonify({"error": "Invalid updates", "details": errors}), 400
+
+            # One round trip checks every id exists and belongs to the seller
+            ids = list(changes)
+            owners = dict(db.session.execute(
+                select(books_table.c.id, books_table.c.seller_id).where(books_table.c.id.in_(ids))
+            ).all())
+            missing = [book_id for book_id in ids if book_id not in owners]
+            if missing:
+                return jsonify({"error": "Books not found", "ids": missing}), 404
+            foreign = [book_id for book_id in ids if owners[book_id] != current_user.id]
+            if foreign:
+                return jsonify({"error": "You can only update your own books", "ids": foreign}), 403
+
+            values = per_book_values(books_table, changes)
+            conditions = [books_table.c.id.in_(ids)]
+        elif 'filter' in data and 'patch' in data:
+            values, errors = patch_values(books_table, data['patch'])
+            conditions, filter_errors = filter_conditions(books_table, data['filter'])
+            errors += filter_errors
+            if errors:
+                return jsonify({"error": "Invalid bulk update", "details": errors}), 400
+        else:
+            return jsonify({"error": "Send either updates or filter and patch"}), 400
+
+        stmt = bulk_update_statement(books_table, current_user.id, values, conditions)
+        returning = bool(data.get('returning')) and db.engine.dialect.update_returning
+        if returning:
+            rows = db.session.execute(stmt.returning(*books_table.c)).fetchall()
+            updated = len(rows)
+        else:
+            updated = db.session.execute(stmt).rowcount
+        db.session.commit()
+        print(f"Bulk update by seller {current_user.id}: {updated} books, fields {sorted(values)}")
+
+        if updated:
+            if touches_search_fields(values):
+                # Rebuilt lazily on the next search
+                book_search.invalidate()
+            invalidate_book_caches()
+
+        response = {"updated": updated, "returning": returning}
+        if 'updates' in data:
+            response["requested"] = len(changes)
+        if returning:
+            response["books"] = rows_to_list(rows, books_table)
+        return jsonify(response), 200
+
+    except IntegrityError as e:
+        # A price change pushing a book outside 0-10000 or a duplicate ISBN - nothing was written
+        db.session.rollback()
+        print(f"Bulk update rejected: {str(e)}")
+        return jsonify({"error": "Update violates a book constraint (price range or duplicate ISBN)"}), 400
+    except Exception as e:
+        return handle_error(e, "bulk updating books")
+
 @book_bp.route('/books', methods=['GET'])
 def get_books():
     try:
@@ -72,38 +256,46 @@ def get_books():
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
         search = request.args.get('search', type=str)
+        # Passing cursor (empty for the first page) switches to keyset pagination
+        cursor = request.args.get('cursor', type=str)
+        # Cursor pages skip the COUNT(*) unless a count is asked for - it would cost a full scan per page
+        count = request.args.get('count', 'exact' if cursor is None else 'none', type=str)
         
         # Get books table
         books_table = get_table('books')
         
-        # Build the query using SQLAlchemy Core
-        query = select(books_table)
-        
-        # Add search functionality if requested
-        if search:
-            query = query.where(
-                or_(
-                    books_table.c.title.ilike(f'%{search}%'),
-                    books_table.c.author.ilike(f'%{search}%'),
-                    books_table.c.genre.ilike(f'%{search}%')
-                )
+        if search or cursor is not None:
+            # Build the query using SQLAlchemy Core
+            query = select(books_table)
+            
+            # Add search functionality if requested (full-text index instead of '%term%' scans)
+            if search:
+                query = book_search.filter(query, books_table, search)
+            
+            if cursor is not None:
+                return _cursor_page(query, books_table, books_table.c.id, cursor, limit, count)
+            
+            # Fetch only the requested page, total comes from COUNT(*)
+            books, total = paginate_query(query.order_by(books_table.c.id), page, limit, count)
+        else:
+            # Unfiltered listing: one prebuilt statement
+            statements = _list_statements.get(
+                books_table, lambda: paged_statements(select(books_table).order_by(books_table.c.id))
             )
-        
-        # Execute the query and get results
-        books = execute_query(query)
-        
-        # Convert to a list of dictionaries
-        book_list = rows_to_list(books, books_table)
-        
-        # Paginate results
-        paginated_books = paginate_results(book_list, page, limit)
-        
-        return jsonify({
-            "page": page,
-            "total": len(book_list),
-            "books": paginated_books
-        }), 200
-        
+            books, total = paginate_prepared(statements, {}, page, limit, count)
+        
+        # 304 if the client already has this page
+        return conditional_json(
+            lambda: {
+                "page": page,
+                "total": total,
+                "books": rows_to_list(books, books_table)
+            },
+            list_etag('books', books, total)
+        )
+        
+    except SearchTooBroadError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return handle_error(e, "listing books")
 
@@ -114,16 +306,22 @@ def search_books():
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
         search_term = request.args.get('q', type=str)
+        # Passing cursor (empty for the first page) switches to keyset pagination
+        cursor = request.args.get('cursor', type=str)
+        # Cursor pages skip the COUNT(*) unless a count is asked for - it would cost a full scan per page
+        count = request.args.get('count', 'exact' if cursor is None else 'none', type=str)
         
         # Filtering parameters
-        min_price = request.args.get('min_price', type=float)
-        max_price = request.args.get('max_price', type=float)
-        genre = request.args.get('genre', type=str)
-        condition = request.args.get('condition', type=str)
-        author = request.args.get('author', type=str)
-        min_year = request.args.get('min_year', type=int)
-        max_year = request.args.get('max_year', type=int)
-        status = request.args.get('status', type=str)
+        filters = {
+            'min_price': request.args.get('min_price', type=float),
+            'max_price': request.args.get('max_price', type=float),
+            'genre': request.args.get('genre', type=str),
+            'condition': request.args.get('condition', type=str),
+            'author': request.args.get('author', type=str),
+            'min_year': request.args.get('min_year', type=int),
+            'max_year': request.args.get('max_year', type=int),
+            'status': request.args.get('status', type=str)
+        }
         
         # Sorting parameters
         sort_by = request.args.get('sort_by', 'id')  # Default to id instead of created_at
@@ -132,105 +330,188 @@ def search_books():
         # Get books table
         books_table = get_table('books')
         
-        # Build the query using SQLAlchemy Core
-        query = select(books_table)
-        
-        # Apply text search
-        if search_term:
-            search_filter = or_(
-                books_table.c.title.ilike(f'%{search_term}%'),
-                books_table.c.author.ilike(f'%{search_term}%'),
-                books_table.c.description.ilike(f'%{search_term}%'),
-                books_table.c.genre.ilike(f'%{search_term}%')
-            )
-            query = query.where(search_filter)
-        
-        # Apply filters
-        if min_price is not None:
-            query = query.where(books_table.c.price >= min_price)
-            
-        if max_price is not None:
-            query = query.where(books_table.c.price <= max_price)
-            
-        if genre:
-            query = query.where(books_table.c.genre.ilike(f'%{genre}%'))
-            
-        if condition:
-            query = query.where(books_table.c.condition == condition)
-            
-        if author:
-            query = query.where(books_table.c.author.ilike(f'%{author}%'))
-            
-        if min_year is not None:
-            query = query.where(books_table.c.publication_year >= min_year)
-            
-        if max_year is not None:
-            query = query.where(books_table.c.publication_year <= max_year)
-            
-        if status:
-            query = query.where(books_table.c.status == status)
-        
-        # Apply sorting - check if the sort column exists in the table
-        if hasattr(books_table.c, sort_by):
-            sort_column = getattr(books_table.c, sort_by)
-        else:
+        # Canonical form of the request: equivalent searches share one cache entry
+        search_term = " ".join(tokenize(search_term)) or None
+        for key in ('genre', 'author'):
+            # Matched with ILIKE, so case and surrounding spaces don't matter
+            filters[key] = filters[key].strip().lower() if filters[key] else None
+        for key in ('condition', 'status'):
+            filters[key] = filters[key] or None
+        if sort_by == 'relevance' and search_term:
+            if cursor is not None:
+                return jsonify({"error": "Cursor pagination is not supported with sort_by=relevance"}), 400
+        elif not hasattr(books_table.c, sort_by):
             # Fallback to id if the requested sort column doesn't exist
-            sort_column = books_table.c.id
-            
-        if sort_order == 'desc':
-            query = query.order_by(desc(sort_column))
-        else:
-            query = query.order_by(sort_column)
+            sort_by = 'id'
+        sort_order = 'desc' if sort_order == 'desc' else 'asc'
         
-        # Execute query 
-        books = execute_query(query)
+        params = dict(
+            filters, q=search_term, sort_by=sort_by, sort_order=sort_order,
+            page=page, limit=limit, count=count, cursor=cursor
+        )
         
-        # Convert to a list of dictionaries
-        book_list = rows_to_list(books, books_table)
-        
-        # Apply pagination
-        paginated_books = paginate_results(book_list, page, limit)
-        
-        return jsonify({
-            "page": page,
-            "total": len(book_list),
-            "books": paginated_books
-        }), 200
+        def load_search_results():
+            return _search_books_payload(books_table, params)
         
+        # Big pages are not worth the cache memory
+        if limit > SEARCH_CACHE_MAX_LIMIT:
+            payload = load_search_results()
+        else:
+            cache_key = json.dumps(params, sort_keys=True)
+            payload = search_results_cache.get_or_load(cache_key, load_search_results)
+        
+        # 304 if the client already has this page (the ETag comes from the payload, cached or not)
+        return conditional_json(
+            lambda: payload,
+            records_etag('books', payload["books"], payload.get("total"))
+        )
+        
+    except ValueError as ve:
+        # Invalid cursor, or a search term too broad for the in-process index
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         return handle_error(e, "searching books")
 
+# Optional search filters: name -> WHERE clause on a bindparam of the same name
+SEARCH_FILTERS = {
+    'min_price': lambda books: books.c.price >= bindparam('min_price'),
+    'max_price': lambda books: books.c.price <= bindparam('max_price'),
+    'genre': lambda books: books.c.genre.ilike(bindparam('genre')),
+    'condition': lambda books: books.c.condition == bindparam('condition'),
+    'author': lambda books: books.c.author.ilike(bindparam('author')),
+    'min_year': lambda books: books.c.publication_year >= bindparam('min_year'),
+    'max_year': lambda books: books.c.publication_year <= bindparam('max_year'),
+    'status': lambda books: books.c.status == bindparam('status')
+}
+
+# Substring matches
+SEARCH_LIKE_FILTERS = ('genre', 'author')
+
+def _search_query(books_table, filters):
+    """select(books) with the WHERE clauses of the given filters"""
+    query = select(books_table)
+    for name in filters:
+        query = query.where(SEARCH_FILTERS[name](books_table))
+    return query
+
+def _search_books_payload(books_table, params):
+    """Run a canonicalized search and return the response body"""
+    # Which filters are present is the statement's shape, their values are bound parameters
+    filters = tuple(name for name in SEARCH_FILTERS if params[name] is not None and params[name] != '')
+    values = {
+        name: f"%{params[name]}%" if name in SEARCH_LIKE_FILTERS else params[name]
+        for name in filters
+    }
+    
+    search_term = params['q']
+    page, limit, count, cursor = params['page'], params['limit'], params['count'], params['cursor']
+    sort_by, descending = params['sort_by'], params['sort_order'] == 'desc'
+    
+    # Plain filtered, sorted, offset-paginated search: prebuilt statement per shape
+    if sort_by != 'relevance' and not search_term and cursor is None:
+        def build():
+            sort_column = books_table.c[sort_by]
+            # id as tie-breaker keeps pages stable when sort values repeat
+            if descending:
+                ordering = (desc(sort_column), desc(books_table.c.id))
+            else:
+                ordering = (sort_column, books_table.c.id)
+            return paged_statements(_search_query(books_table, filters).order_by(*ordering))
+        
+        statements = _search_statements.get((books_table, filters, sort_by, descending), build)
+        books, total = paginate_prepared(statements, values, page, limit, count)
+        return {
+            "page": page,
+            "total": total,
+            "books": rows_to_list(books, books_table)
+        }
+    
+    # Text search and cursors add clauses that depend on the values - build this one per request
+    query = _search_query(books_table, filters).params(values)
+    
+    # Relevance ranking comes from the text search index
+    if sort_by == 'relevance':
+        books, total = book_search.paginate_by_relevance(
+            query, books_table, search_term, page, limit, count
+        )
+        return {
+            "page": page,
+            "total": total,
+            "books": rows_to_list(books, books_table)
+        }
+    
+    # Apply text search (full-text index instead of '%term%' scans)
+    if search_term:
+        query = book_search.filter(query, books_table, search_term)
+    
+    sort_column = getattr(books_table.c, sort_by)
+    
+    if cursor is not None:
+        return _cursor_payload(
+            query, books_table, sort_column, cursor, limit, count,
+            descending=descending
+        )
+        
+    # id as tie-breaker keeps pages stable when sort values repeat
+    if descending:
+        query = query.order_by(desc(sort_column), desc(books_table.c.id))
+    else:
+        query = query.order_by(sort_column, books_table.c.id)
+    
+    # Fetch only the requested page, total comes from COUNT(*)
+    books, total = paginate_query(query, page, limit, count)
+    
+    return {
+        "page": page,
+        "total": total,
+        "books": rows_to_list(books, books_table)
+    }
+
+def _cursor_payload(query, books_table, sort_column, cursor, limit, count, descending=False):
+    """Keyset-paginated books response body with an opaque next_cursor (ValueError on a bad cursor)"""
+    books, next_cursor = keyset_paginate(
+        query, sort_column, books_table.c.id, cursor, limit, descending
+    )
+    return {
+        "total": count_query(query, count),
+        "next_cursor": next_cursor,
+        "books": rows_to_list(books, books_table)
+    }
+
+def _cursor_page(query, books_table, sort_column, cursor, limit, count, descending=False):
+    """Build a keyset-paginated books response with an opaque next_cursor"""
+    try:
+        payload = _cursor_payload(query, books_table, sort_column, cursor, limit, count, descending)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    
+    return jsonify(payload), 200
+
 @book_bp.route('/books/featured', methods=['GET'])
 def get_featured_books():
     try:
         # Get query parameters
         limit = request.args.get('limit', 6, type=int)
         
-        # Use direct SQL approach to avoid loading relationships
-        from sqlalchemy import Table, MetaData, select, desc
-        
-        # Create the books table object
-        metadata = MetaData()
-        books_table = Table('books', metadata, autoload_with=db.engine)
-        
-        # Build the query for newest available books - use id instead of created_at
-        query = select(books_table).where(
-            books_table.c.status == 'Available'
-        ).order_by(
-            desc(books_table.c.id)  # Sort by ID descending to get newest
-        ).limit(limit)
-        
-        # Execute the query
-        result = db.session.execute(query)
-        books = result.fetchall()
+        def load_featured_books():
+            # Use direct SQL approach to avoid loading relationships
+            books_table = get_table('books')
+            
+            # Build the query for newest available books - use id instead of created_at
+            query = select(books_table).where(
+                books_table.c.status == 'Available'
+            ).order_by(
+                desc(books_table.c.id)  # Sort by ID descending to get newest
+            ).limit(limit)
+            
+            # Execute the query
+            result = db.session.execute(query)
+            
+            # Convert to list of dictionaries
+            return rows_to_list(result, books_table)
         
-        # Convert to list of dictionaries
-        featured_books = []
-        for book in books:
-            book_dict = {}
-            for column in books_table.columns:
-                book_dict[column.name] = getattr(book, column.name)
-            featured_books.append(book_dict)
+        # Served from the cache until a book or order write invalidates it
+        featured_books = featured_books_cache.get_or_load(limit, load_featured_books)
         
         return jsonify({
             "featured_books": featured_books
@@ -276,7 +557,7 @@ def update_book(id):
         # Prepare update data
         valid_update_data = {}
         for key, value in update_data.items():
-            if key in valid_fields and key != 'id':
+            if key in valid_fields and key not in ('id', 'updated_at'):
                 valid_update_data[key] = value
                 changes.append(f"{key}: {value}")
         
@@ -297,6 +578,10 @@ def update_book(id):
         db.session.commit()
         print(f"Book updated successfully, fields changed: {', '.join(changes)}")
         
+        # Keep the text search index in sync with the new values
+        book_search.refresh(books_table, id)
+        invalidate_book_caches()
+        
         # Get the updated book
         updated_book = execute_query(check_query, single_result=True)
         book_dict = row_to_dict(updated_book, books_table)
@@ -306,6 +591,13 @@ def update_book(id):
     except ValidationError as err:
         print(f"Validation error: {err.messages}")
         return jsonify(err.messages), 400
+    except IntegrityError as e:
+        db.session.rollback()
+        print(f"Book update rejected: {str(e)}")
+        conflict = _isbn_conflict(book.seller_id, valid_update_data.get('isbn'), id)
+        if conflict:
+            return conflict
+        return jsonify({"error": "Update violates a book constraint"}), 400
     except Exception as e:
         db.session.rollback()
         print(f"Error updating book: {str(e)}")
@@ -317,62 +609,56 @@ def delete_book(id):
     try:
         print(f"Attempting to delete book with ID: {id}")
         
-        # Start a transaction with explicit connection
-        connection = db.engine.connect()
-        transaction = connection.begin()
+        # Check if book exists and get book details
+        books_table = get_table('books')
+        reviews_table = get_table('reviews')
+        order_book_table = get_table('order_book')
         
-        try:
-            # Check if book exists and get book details
-            books_table = get_table('books')
-            reviews_table = get_table('reviews')
-            order_book_table = get_table('order_book')
-            
-            check_query = select(books_table).where(books_table.c.id == id)
-            book = connection.execute(check_query).fetchone()
-            
-            if not book:
-                transaction.rollback()
-                print(f"Book with ID {id} not found")
-                return jsonify({"error": "Book not found"}), 404
-            
-            print(f"Found book with title '{book.title}', proceeding with deletion")
-            
-            # 1. Update reviews to set book_id to NULL
-            print(f"Setting book_id to NULL in reviews for book {id}")
-            update_reviews_query = text(f"UPDATE reviews SET book_id = NULL WHERE book_id = {id}")
-            connection.execute(update_reviews_query)
-            
-            # 2. Delete entries from order_book junction table
-            print(f"Deleting entries from order_book junction table for book {id}")
-            delete_order_book_query = text(f"DELETE FROM order_book WHERE book_id = {id}")
-            connection.execute(delete_order_book_query)
-            
-            # 3. Now delete the book
-            print(f"Deleting book with ID {id}")
-            delete_book_query = text(f"DELETE FROM books WHERE id = {id}")
-            result = connection.execute(delete_book_query)
-            
-            if result.rowcount == 0:
-                transaction.rollback()
-                print(f"No rows affected by book deletion query")
-                return jsonify({"error": "Book could not be deleted"}), 500
-            
-            # Commit transaction if all operations succeeded
-            transaction.commit()
-            print(f"Book with ID {id} deleted successfully")
-            
-            return jsonify({"message": "Book deleted successfully"}), 200
-            
-        except Exception as e:
-            # Roll back on error
-            transaction.rollback()
-            print(f"Error during book deletion, transaction rolled back: {str(e)}")
-            raise e
-        finally:
-            connection.close()
+        check_query = select(books_table).where(books_table.c.id == id)
+        book = db.session.execute(check_query).fetchone()
+        
+        if not book:
+            print(f"Book with ID {id} not found")
+            return jsonify({"error": "Book not found"}), 404
+        
+        print(f"Found book with title '{book.title}', proceeding with deletion")
+        
+        # All three statements run in the session's transaction on its pooled connection
+        # 1. Update reviews to set book_id to NULL
+        print(f"Setting book_id to NULL in reviews for book {id}")
+        db.session.execute(
+            update(reviews_table).where(reviews_table.c.book_id == id).values(book_id=None)
+        )
+        
+        # 2. Delete entries from order_book junction table
+        print(f"Deleting entries from order_book junction table for book {id}")
+        db.session.execute(
+            delete(order_book_table).where(order_book_table.c.book_id == id)
+        )
+        
+        # 3. Now delete the book
+        print(f"Deleting book with ID {id}")
+        result = db.session.execute(delete(books_table).where(books_table.c.id == id))
+        
+        if result.rowcount == 0:
+            db.session.rollback()
+            print(f"No rows affected by book deletion query")
+            return jsonify({"error": "Book could not be deleted"}), 500
+        
+        # Commit only if all operations succeeded
+        db.session.commit()
+        print(f"Book with ID {id} deleted successfully")
+        
+        # Drop the book from the text search index
+        book_search.remove(books_table, id)
+        invalidate_book_caches()
+        
+        return jsonify({"message": "Book deleted successfully"}), 200
             
     except Exception as e:
-        print(f"Error deleting book: {str(e)}")
+        # Roll back on error
+        db.session.rollback()
+        print(f"Error deleting book, transaction rolled back: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @book_bp.route('/book/<int:id>/upload-image', methods=['POST'])
@@ -419,6 +705,7 @@ def upload_book_image(current_user, id):
         # Update book image_url
         book.image_url = f"/static/uploads/books/{unique_filename}"
         db.session.commit()
+        invalidate_book_caches()
         
         return jsonify({
             "message": "Image uploaded successfully",
@@ -0,0 +1,169 @@
+"""
+Streaming exports for analytics and marketplace sync jobs.
+
+Rows are read in keyset-paged batches - one SELECT ... ORDER BY ... LIMIT per
+batch, seeking past the last row sent - and written out as each batch arrives,
+so memory stays flat whatever the table size, also with drivers that buffer a
+whole result set client-side (mysql-connector has no server-side cursors).
+
+    GET /export/books | /export/orders | /export/reviews
+        ?format=ndjson (default) | csv
+        ?since=<ISO datetime>   only rows with updated_at >= since (incremental sync)
+        ?gzip=1 or Accept-Encoding: gzip   gzip-compressed body
+
+The X-Export-Started header is the value to pass as `since` on the next sync.
+updated_at is set by the app before the writing transaction commits, so a row can
+become visible after a sync already read past its timestamp. `since` is therefore
+moved back by EXPORT_SINCE_OVERLAP seconds: rows near the boundary are sent again
+(consumers must upsert by id) and transactions committing within the overlap are
+not missed. Longer transactions can still be missed - raise the overlap for them.
+"""
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime, date, timedelta
+from flask import request, jsonify, Blueprint, Response, stream_with_context
+from sqlalchemy import select
+from models import db
+from utils.db_helpers import get_table, handle_error, keyset_condition
+from utils.serialization import encode_value
+
+export_bp = Blueprint('export', __name__)
+
+# Rows per keyset-paged SELECT
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+# Seconds `since` is moved back to catch rows whose transaction committed late
+EXPORT_SINCE_OVERLAP = float(os.getenv('EXPORT_SINCE_OVERLAP', 60))
+
+# Tables that can be exported (users are left out on purpose - passwords, emails)
+EXPORT_TABLES = {
+    'books': 'books',
+    'orders': 'orders',
+    'reviews': 'reviews'
+}
+
+def _encode_value(value):
+    """
+    JSON/CSV friendly form of a column value: utils.serialization.encode_value, except that
+    dates are ISO 8601 instead of the API's HTTP dates - sync jobs parse them, sort them and
+    pass updated_at back as `since`, which takes ISO 8601
+    """
+    if isinstance(value, date):
+        return value.isoformat()
+    return encode_value(value)
+
+def _ndjson_chunks(columns, partitions):
+    for rows in partitions:
+        yield "".join(
+            json.dumps({name: _encode_value(value) for name, value in zip(columns, row)}) + "\n"
+            for row in rows
+        )
+
+def _csv_chunks(columns, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows([_encode_value(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Header only when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _wants_gzip():
+    if request.args.get('gzip') in ('1', 'true'):
+        return True
+    # Quality 0 (gzip;q=0) means the client refuses gzip
+    return request.accept_encodings['gzip'] > 0
+
+def _export(table_name):
+    output_format = request.args.get('format', 'ndjson', type=str)
+    if output_format not in ('ndjson', 'csv'):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    since = request.args.get('since', type=str)
+    if since:
+        try:
+            since = datetime.fromisoformat(since) - timedelta(seconds=EXPORT_SINCE_OVERLAP)
+        except ValueError:
+            return jsonify({"error": "since must be an ISO 8601 datetime"}), 400
+
+    table = get_table(EXPORT_TABLES[table_name])
+    started = datetime.now()
+
+    query = select(table)
+    if since:
+        # Changed rows only, oldest change first (served by the updated_at index)
+        query = query.where(table.c.updated_at >= since)
+        sort_column = table.c.updated_at
+        ordering = (table.c.updated_at, table.c.id)
+    else:
+        sort_column = table.c.id
+        ordering = (table.c.id,)
+
+    columns = [column.name for column in table.columns]
+    compress = _wants_gzip()
+
+    def partitions():
+        # One bounded SELECT per batch, seeking past the last row of the previous one
+        page = query
+        while True:
+            rows = db.session.execute(page.order_by(*ordering).limit(EXPORT_BATCH_SIZE)).fetchall()
+            if rows:
+                yield rows
+            if len(rows) < EXPORT_BATCH_SIZE:
+                return
+            last = rows[-1]._mapping
+            page = query.where(keyset_condition(sort_column, table.c.id, last[sort_column.name], last['id']))
+
+    def generate():
+        if output_format == 'csv':
+            chunks = _csv_chunks(columns, partitions())
+        else:
+            chunks = _ndjson_chunks(columns, partitions())
+        if compress:
+            chunks = _gzip_chunks(chunks)
+        yield from chunks
+
+    mimetype = 'text/csv' if output_format == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{table_name}.{output_format}"'
+    response.headers['X-Export-Started'] = started.isoformat()
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+@export_bp.route('/export/books', methods=['GET'])
+def export_books():
+    try:
+        return _export('books')
+    except Exception as e:
+        return handle_error(e, "exporting books")
+
+@export_bp.route('/export/orders', methods=['GET'])
+def export_orders():
+    try:
+        return _export('orders')
+    except Exception as e:
+        return handle_error(e, "exporting orders")
+
+@export_bp.route('/export/reviews', methods=['GET'])
+def export_reviews():
+    try:
+        return _export('reviews')
+    except Exception as e:
+        return handle_error(e, "exporting reviews")
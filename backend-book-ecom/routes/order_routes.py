@@ -1,15 +1,180 @@
 from flask import request, jsonify, Blueprint
 from marshmallow import ValidationError
-from sqlalchemy import select, Table, MetaData, insert, update, delete
+from sqlalchemy import select, Table, MetaData, insert, update, delete, text
 from schemas.order_schema import order_schema, orders_schema, OrderSchema
 from models import db, Order
+from datetime import datetime
+from decimal import Decimal
+from collections import Counter
+import os
 from utils.db_helpers import (
-    get_table, row_to_dict, rows_to_list, paginate_results,
-    handle_error, execute_query, get_by_id, create_record
+    get_table, row_to_dict, rows_to_list, paginate_query,
+    handle_error, execute_query, get_by_id, create_record, attach_order_books,
+    order_books_version
 )
+from utils.cache import invalidate_book_caches
+from utils.http_cache import conditional_json, list_etag, row_etag, last_modified_of
 
 order_bp = Blueprint('order', __name__)
 
+# Upper bound for POST /orders/batch so one transaction can't grow without limit
+MAX_BATCH_ORDERS = int(os.getenv('MAX_BATCH_ORDERS', 1000))
+
+# Columns PUT /order/<id> never takes from the client
+ORDER_READ_ONLY_FIELDS = ('id', 'user_id', 'total_amount', 'order_date', 'created_at', 'updated_at')
+
+class OrderBooksError(Exception):
+    """Raised when an order references books that can't be ordered"""
+
+class BooksUnavailableError(OrderBooksError):
+    """Raised when ordered books are already reserved or sold"""
+    def __init__(self, book_ids, message="Books not available"):
+        self.book_ids = book_ids
+        super().__init__(f"{message}: {book_ids}")
+
+def _load_book_prices(orders_data):
+    """Fetch id, price and status of every book in the orders with one IN (...) query"""
+    book_ids = {book_id for order_data in orders_data for book_id in order_data.get('books') or []}
+    if not book_ids:
+        return {}
+    
+    books_table = get_table('books')
+    rows = db.session.execute(
+        select(books_table.c.id, books_table.c.price, books_table.c.status).where(
+            books_table.c.id.in_(book_ids)
+        )
+    ).fetchall()
+    books = {row.id: row for row in rows}
+    
+    missing = sorted(book_ids - set(books))
+    if missing:
+        raise OrderBooksError(f"Books not found: {missing}")
+    return books
+
+def _prepare_order(order_data, books):
+    """Build the orders row for one order payload - only core fields"""
+    # The total is always computed from current book prices, never taken from the client
+    total_amount = sum(
+        (Decimal(str(books[book_id].price)) for book_id in order_data.get('books') or []),
+        Decimal('0.00')
+    )
+    insert_data = {
+        'user_id': order_data.get('user_id', 1),  # Default to user 1 if not provided
+        'total_amount': total_amount,
+        'status': 'Pending',  # Default status
+        'payment_status': 'Unpaid',  # Default payment status
+        'order_date': datetime.now(),  # Set the order date
+        'created_at': datetime.now()  # Set the created_at date
+    }
+    
+    # Add shipping_address_id only if provided to avoid null constraint issues
+    if 'shipping_address_id' in order_data and order_data['shipping_address_id']:
+        insert_data['shipping_address_id'] = order_data['shipping_address_id']
+    
+    return insert_data
+
+def _reserve_books(orders_data, books):
+    """
+    Reserve every ordered book with one conditional UPDATE - all or nothing.
+    Runs right before the inserts so row locks are only held until the commit.
+    """
+    book_ids = [book_id for order_data in orders_data for book_id in order_data.get('books') or []]
+    if not book_ids:
+        return
+    
+    # A used book is a single copy - it can only be in one line item
+    duplicates = sorted(book_id for book_id, count in Counter(book_ids).items() if count > 1)
+    if duplicates:
+        raise OrderBooksError(f"Books ordered more than once: {duplicates}")
+    
+    # Fail fast on books we already know are taken, before taking any locks
+    unavailable = sorted(book_id for book_id in book_ids if books[book_id].status != 'Available')
+    if unavailable:
+        raise BooksUnavailableError(unavailable)
+    
+    books_table = get_table('books')
+    stmt = update(books_table).where(
+        books_table.c.id.in_(book_ids),
+        books_table.c.status == 'Available'
+    ).values(status='Reserved')
+    result = db.session.execute(stmt)
+    
+    # A concurrent checkout reserved some of them after our read
+    if result.rowcount != len(book_ids):
+        raise BooksUnavailableError(sorted(book_ids), "One or more books are no longer available")
+
+def _release_books(order_id):
+    """Put the books reserved by an order back on sale"""
+    books_table = get_table('books')
+    order_book_table = get_table('order_book')
+    stmt = update(books_table).where(
+        books_table.c.id.in_(
+            select(order_book_table.c.book_id).where(order_book_table.c.order_id == order_id)
+        ),
+        books_table.c.status == 'Reserved'
+    ).values(status='Available')
+    return db.session.execute(stmt).rowcount
+
+def _auto_increment_step():
+    """MySQL's @@auto_increment_increment (1 unless set up for multi-primary replication)"""
+    return db.session.execute(text("SELECT @@auto_increment_increment")).scalar()
+
+def _insert_order_rows(orders_table, order_rows):
+    """Insert the order rows with as few round trips as the database allows, return their ids in order"""
+    if len(order_rows) > 1:
+        params = [dict({'shipping_address_id': None}, **row) for row in order_rows]
+        
+        if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+            # One multi-row INSERT ... RETURNING id
+            stmt = insert(orders_table).returning(orders_table.c.id, sort_by_parameter_order=True)
+            return db.session.execute(stmt, params).scalars().all()
+        
+        if db.engine.dialect.name == 'mysql':
+            # One multi-row INSERT ... VALUES. InnoDB hands a single INSERT with a known row count
+            # consecutive auto-increment values (in every innodb_autoinc_lock_mode), and LAST_INSERT_ID()
+            # is the first of them, so the ids follow from lastrowid and the increment step
+            result = db.session.execute(insert(orders_table).values(params))
+            step = _auto_increment_step()
+            return [result.lastrowid + i * step for i in range(len(params))]
+    
+    return [
+        db.session.execute(insert(orders_table).values(**row)).inserted_primary_key[0]
+        for row in order_rows
+    ]
+
+def _insert_orders(orders_data):
+    """
+    Insert orders and all of their order_book line items in the current transaction.
+    The orders go in with one multi-row INSERT (RETURNING, or lastrowid on MySQL), the
+    line items with a single executemany, keeping the unit price paid.
+    The ordered books are reserved first - raises BooksUnavailableError on conflict.
+    Returns the inserted rows with ids.
+    """
+    orders_table = get_table('orders')
+    books = _load_book_prices(orders_data)
+    order_rows = [_prepare_order(order_data, books) for order_data in orders_data]
+    _reserve_books(orders_data, books)
+    
+    order_ids = _insert_order_rows(orders_table, order_rows)
+    
+    # Collect the line items of every order
+    line_items = []
+    for row, order_id, order_data in zip(order_rows, order_ids, orders_data):
+        row['id'] = order_id
+        for book_id in order_data.get('books') or []:
+            line_items.append({
+                'order_id': order_id,
+                'book_id': book_id,
+                'unit_price': books[book_id].price  # Price snapshot at checkout
+            })
+    
+    # Add them to the order_book junction table in one round trip
+    if line_items:
+        order_book_table = get_table('order_book')
+        db.session.execute(insert(order_book_table), line_items)
+    
+    return order_rows
+
 @order_bp.route('/orders', methods=['POST'])
 def create_order():
     try:
@@ -19,51 +184,23 @@ def create_order():
         # Print debug info
         print(f"Attempting to create order with data: {order_data}")
         
-        # Use direct SQL approach instead of ORM to avoid relationship loading issues
-        metadata = MetaData()
-        orders_table = Table('orders', metadata, autoload_with=db.engine)
-        
-        # Import datetime
-        from datetime import datetime
-        
-        # Prepare the data for insertion - only include core fields
-        insert_data = {
-            'user_id': order_data.get('user_id', 1),  # Default to user 1 if not provided
-            'total_amount': order_data.get('total_amount', 0),  # Default to 0 if not provided
-            'status': 'Pending',  # Default status
-            'payment_status': 'Unpaid',  # Default payment status
-            'order_date': datetime.now(),  # Set the order date
-            'created_at': datetime.now()  # Set the created_at date
-        }
-        
-        # Add shipping_address_id only if provided to avoid null constraint issues
-        if 'shipping_address_id' in order_data and order_data['shipping_address_id']:
-            insert_data['shipping_address_id'] = order_data['shipping_address_id']
-            
-        # Insert the order
-        stmt = insert(orders_table).values(**insert_data)
-        result = db.session.execute(stmt)
-        order_id = result.inserted_primary_key[0]
-        
-        # If books were provided, add them to the order_book junction table
-        if 'books' in order_data and order_data['books']:
-            # Create table object for order_book junction
-            order_book_table = Table('order_book', metadata, autoload_with=db.engine)
-            
-            # Add each book to the order
-            for book_id in order_data['books']:
-                book_data = {
-                    'order_id': order_id,
-                    'book_id': book_id
-                }
-                book_stmt = insert(order_book_table).values(**book_data)
-                db.session.execute(book_stmt)
+        # Insert the order and its books
+        try:
+            insert_data = _insert_orders([order_data])[0]
+        except BooksUnavailableError as be:
+            db.session.rollback()
+            return jsonify({"error": str(be), "unavailable_books": be.book_ids}), 409
+        except OrderBooksError as oe:
+            db.session.rollback()
+            return jsonify({"error": str(oe)}), 400
         
         # Commit all changes
         db.session.commit()
         
+        # The ordered books are no longer Available
+        invalidate_book_caches()
+        
         # Return success response
-        insert_data['id'] = order_id
         return jsonify({
             "message": "Order created successfully",
             "order": insert_data
@@ -76,6 +213,43 @@ def create_order():
         print(f"Order creation error: {str(e)}")
         return jsonify({"error": "Something went wrong", "details": str(e)}), 500
 
+# Create many orders in one request and one transaction (marketplace importer)
+@order_bp.route('/orders/batch', methods=['POST'])
+def create_orders_batch():
+    try:
+        orders_data = (request.json or {}).get('orders')
+        
+        if not isinstance(orders_data, list) or not orders_data:
+            return jsonify({"error": "orders must be a non-empty list"}), 400
+            
+        if len(orders_data) > MAX_BATCH_ORDERS:
+            return jsonify({"error": f"A batch can contain at most {MAX_BATCH_ORDERS} orders"}), 400
+            
+        if not all(isinstance(order_data, dict) for order_data in orders_data):
+            return jsonify({"error": "Each order must be an object"}), 400
+        
+        # All orders succeed or none do
+        try:
+            order_rows = _insert_orders(orders_data)
+        except BooksUnavailableError as be:
+            db.session.rollback()
+            return jsonify({"error": str(be), "unavailable_books": be.book_ids}), 409
+        except OrderBooksError as oe:
+            db.session.rollback()
+            return jsonify({"error": str(oe)}), 400
+        db.session.commit()
+        invalidate_book_caches()
+        
+        return jsonify({
+            "message": f"{len(order_rows)} orders created successfully",
+            "orders": order_rows
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"Batch order creation error: {str(e)}")
+        return jsonify({"error": "Something went wrong", "details": str(e)}), 500
+
 #GET Methods
 @order_bp.route('/orders', methods=['GET'])
 def get_orders():
@@ -83,35 +257,73 @@ def get_orders():
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
+        count = request.args.get('count', 'exact', type=str)
+        include = request.args.get('include', '', type=str)
+        include_fields = include.split(',') if include else []
         
         # Use direct SQL approach to avoid loading relationships
         orders_table = get_table('orders')
         
         # Build query to exclude canceled orders
-        query = select(orders_table).where(orders_table.c.status != "Cancelled")
+        query = select(orders_table).where(
+            orders_table.c.status != "Cancelled"
+        ).order_by(orders_table.c.id)
         
-        # Execute query
-        orders = execute_query(query)
+        # Fetch only the requested page, total comes from COUNT(*)
+        orders, total = paginate_query(query, page, limit, count)
         
-        # Convert to list of dictionaries
-        order_list = rows_to_list(orders, orders_table)
+        def build_payload():
+            order_list = rows_to_list(orders, orders_table)
+            
+            # Optionally load the books of every order on the page in one query
+            if "books" in include_fields:
+                attach_order_books(order_list)
+            
+            return {
+                "page": page,
+                "total": total,
+                "orders": order_list
+            }
         
-        # Paginate results
-        paginated_orders = paginate_results(order_list, page, limit)
+        # Embedded books change without touching the orders - their version is part of the ETag
+        books_version = order_books_version([order.id for order in orders]) if "books" in include_fields else None
         
-        return jsonify({
-            "page": page,
-            "total": len(order_list),
-            "orders": paginated_orders
-        }), 200
+        # 304 if the client already has this page
+        return conditional_json(build_payload, list_etag('orders', orders, total, related=books_version))
 
     except Exception as e:
         return handle_error(e, "getting orders")
 
 @order_bp.route('/order/<int:id>', methods=['GET'])
 def get_order(id):
-    # Simply use our helper function
-    return get_by_id('orders', id)
+    include = request.args.get('include', '', type=str)
+    include_fields = include.split(',') if include else []
+    
+    # Without includes simply use our helper function
+    if "books" not in include_fields:
+        return get_by_id('orders', id)
+    
+    try:
+        result = get_by_id('orders', id, response=False)
+        if not result:
+            return jsonify({"error": "Order not found"}), 404
+        
+        row, orders_table = result
+        books_version = order_books_version([row.id])
+        
+        def build_payload():
+            order_dict = row_to_dict(row, orders_table)
+            attach_order_books([order_dict])
+            return order_dict
+        
+        # 304 if neither the order nor its books changed
+        return conditional_json(
+            build_payload,
+            row_etag('orders', row, related=books_version),
+            last_modified_of([row], books_version[0])
+        )
+    except Exception as e:
+        return handle_error(e, "getting order")
 
 # PUT
 @order_bp.route('/order/<int:id>', methods=['PUT'])
@@ -126,17 +338,35 @@ def update_order(id):
         if not result:
             return jsonify({"error": "Order not found"}), 404
             
-        # Prepare update data from request
+        # Prepare update data from request - the total comes from the line items' unit prices
+        # and the buyer is fixed at checkout, so neither can be rewritten here
         update_data = {}
         for key, value in request.json.items():
-            if hasattr(orders_table.c, key):
+            if hasattr(orders_table.c, key) and key not in ORDER_READ_ONLY_FIELDS:
                 update_data[key] = value
         
+        if not update_data:
+            return jsonify({"message": "No changes made"}), 200
+        
         # Update the order
         stmt = update(orders_table).where(orders_table.c.id == id).values(**update_data)
-        db.session.execute(stmt)
+        if 'status' in update_data:
+            # A cancelled order has released its books - it can't come back
+            stmt = stmt.where(orders_table.c.status != "Cancelled")
+        result = db.session.execute(stmt)
+        
+        if 'status' in update_data and result.rowcount == 0:
+            db.session.rollback()
+            return jsonify({"error": "Order is cancelled, its status can no longer change"}), 409
+        
+        # Cancelling here releases the reservations just like PUT /order/<id>/cancel
+        released = _release_books(id) if update_data.get('status') == "Cancelled" else 0
         db.session.commit()
         
+        # Released books are back in the featured list
+        if released:
+            invalidate_book_caches()
+        
         # Return the updated order
         return get_by_id('orders', id)
         
@@ -157,10 +387,22 @@ def cancel_order(id):
             return jsonify({"error": "Order not found"}), 404
         
         # Set the status to cancelled (correct spelling with double l)
-        stmt = update(orders_table).where(orders_table.c.id == id).values(status="Cancelled")
-        db.session.execute(stmt)
+        stmt = update(orders_table).where(
+            orders_table.c.id == id,
+            orders_table.c.status != "Cancelled"
+        ).values(status="Cancelled")
+        result = db.session.execute(stmt)
+        
+        # Release the order's reservations - only on the first cancel, so repeating it
+        # can't free books another order has reserved since
+        if result.rowcount:
+            _release_books(id)
+        
         db.session.commit()
         
+        if result.rowcount:
+            invalidate_book_caches()
+        
         return jsonify({"message": "Order cancelled successfully"}), 200
         
     except Exception as e:
@@ -1,6 +1,6 @@
 from flask import request, jsonify, Blueprint
 from marshmallow import ValidationError
-from sqlalchemy import select, or_, and_, desc, insert, update, delete
+from sqlalchemy import select, or_, and_, desc, insert, update, delete, bindparam
 from models import db
 from models.review_model import Review
 from models.user_model import User
@@ -8,13 +8,20 @@ from models.book_model import Book
 from schemas.review_schema import review_schema, reviews_schema
 from routes.auth_routes import token_required
 from utils.db_helpers import (
-    get_table, row_to_dict, rows_to_list, paginate_results,
-    handle_error, execute_query, get_by_id
+    get_table, row_to_dict, rows_to_list, paginate_query, paginate_prepared,
+    handle_error, execute_query, get_by_id, attach_related, rows_version
 )
+from utils.statement_cache import statement_cache, paged_statements
+from utils.seller_stats import apply_rating_change
+from utils.http_cache import conditional_json, list_etag
 from datetime import datetime
 
 review_bp = Blueprint('review', __name__)
 
+# Prebuilt statements for GET /users/<id>/reviews
+_user_statements = statement_cache('user_exists')
+_review_statements = statement_cache('user_reviews')
+
 @review_bp.route('/reviews', methods=['POST'])
 # @token_required - Temporarily removed for testing
 def create_review():
@@ -71,21 +78,8 @@ def create_review():
         # Get the new review ID
         review_id = result.inserted_primary_key[0]
         
-        # Update seller rating
-        seller_reviews_query = select(reviews_table).where(reviews_table.c.seller_id == data['seller_id'])
-        seller_reviews = execute_query(seller_reviews_query)
-        
-        if seller_reviews:
-            total_rating = sum(review.rating for review in seller_reviews) + data['rating']
-            avg_rating = total_rating / (len(seller_reviews) + 1)
-            
-            # Update seller rating
-            update_stmt = update(users_table).where(
-                users_table.c.id == data['seller_id']
-            ).values(
-                rating=avg_rating
-            )
-            db.session.execute(update_stmt)
+        # Update seller rating totals in the same transaction
+        apply_rating_change(data['seller_id'], data['rating'], 1)
         
         db.session.commit()
         
@@ -110,27 +104,26 @@ def get_reviews():
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
+        count = request.args.get('count', 'exact', type=str)
         
         # Get reviews table
         reviews_table = get_table('reviews')
         
         # Build query
-        query = select(reviews_table)
-        
-        # Execute query
-        reviews = execute_query(query)
-        
-        # Convert to list of dictionaries
-        review_list = rows_to_list(reviews, reviews_table)
-        
-        # Paginate results
-        paginated_reviews = paginate_results(review_list, page, limit)
-        
-        return jsonify({
-            "page": page, 
-            "total": len(review_list),
-            "reviews": paginated_reviews
-        }), 200
+        query = select(reviews_table).order_by(reviews_table.c.id)
+        
+        # Fetch only the requested page, total comes from COUNT(*)
+        reviews, total = paginate_query(query, page, limit, count)
+        
+        # 304 if the client already has this page
+        return conditional_json(
+            lambda: {
+                "page": page, 
+                "total": total,
+                "reviews": rows_to_list(reviews, reviews_table)
+            },
+            list_etag('reviews', reviews, total)
+        )
     except Exception as e:
         return handle_error(e, "getting reviews")
 
@@ -145,10 +138,12 @@ def update_review(id):
     try:
         # Get tables
         reviews_table = get_table('reviews')
-        users_table = get_table('users')
         
-        # First check if the review exists
-        result, _ = get_by_id('reviews', id, response=False)
+        # First check if the review exists - the row stays locked until commit so a concurrent
+        # update can't read the same old rating and apply its delta twice
+        result = db.session.execute(
+            select(reviews_table).where(reviews_table.c.id == id).with_for_update()
+        ).fetchone()
         
         if not result:
             return jsonify({"error": "Review not found"}), 404
@@ -164,32 +159,16 @@ def update_review(id):
         update_data = {}
         for key, value in data.items():
             # Prevent changing buyer_id or seller_id
-            if key not in ['buyer_id', 'seller_id'] and hasattr(reviews_table.c, key):
+            if key not in ['buyer_id', 'seller_id', 'updated_at'] and hasattr(reviews_table.c, key):
                 update_data[key] = value
         
         # Update the review
         stmt = update(reviews_table).where(reviews_table.c.id == id).values(**update_data)
         db.session.execute(stmt)
         
-        # If rating changed, update seller's average rating
+        # If rating changed, shift the seller's rating total by the difference
         if 'rating' in data and data['rating'] != old_rating:
-            # Get all reviews for the seller
-            seller_id = result.seller_id
-            seller_reviews_query = select(reviews_table).where(reviews_table.c.seller_id == seller_id)
-            seller_reviews = execute_query(seller_reviews_query)
-            
-            if seller_reviews:
-                # Calculate new average rating
-                total_rating = sum(r.rating for r in seller_reviews)
-                avg_rating = total_rating / len(seller_reviews)
-                
-                # Update seller rating
-                update_seller_stmt = update(users_table).where(
-                    users_table.c.id == seller_id
-                ).values(
-                    rating=avg_rating
-                )
-                db.session.execute(update_seller_stmt)
+            apply_rating_change(result.seller_id, data['rating'] - old_rating, 0)
             
         db.session.commit()
         
@@ -208,7 +187,6 @@ def delete_review(id):
     try:
         # Get tables
         reviews_table = get_table('reviews')
-        users_table = get_table('users')
         
         # First check if the review exists
         result, _ = get_by_id('reviews', id, response=False)
@@ -224,32 +202,12 @@ def delete_review(id):
         
         # Delete the review
         delete_stmt = delete(reviews_table).where(reviews_table.c.id == id)
-        db.session.execute(delete_stmt)
-        
-        # Update seller rating
-        seller_reviews_query = select(reviews_table).where(reviews_table.c.seller_id == seller_id)
-        seller_reviews = execute_query(seller_reviews_query)
+        deleted = db.session.execute(delete_stmt).rowcount
         
-        if seller_reviews:
-            # Calculate new average rating
-            total_rating = sum(r.rating for r in seller_reviews)
-            avg_rating = total_rating / len(seller_reviews)
-            
-            # Update seller rating
-            update_seller_stmt = update(users_table).where(
-                users_table.c.id == seller_id
-            ).values(
-                rating=avg_rating
-            )
-            db.session.execute(update_seller_stmt)
-        else:
-            # No reviews left, reset to default rating of 0
-            update_seller_stmt = update(users_table).where(
-                users_table.c.id == seller_id
-            ).values(
-                rating=0
-            )
-            db.session.execute(update_seller_stmt)
+        # Remove the rating from the seller's totals (rating resets to 0 when no reviews are left),
+        # only if this request deleted the row - a concurrent delete already took it off
+        if deleted == 1:
+            apply_rating_change(seller_id, -result.rating, -1)
             
         db.session.commit()
         
@@ -266,36 +224,44 @@ def get_user_reviews(id):
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
         type_filter = request.args.get('type', 'buyer')  # 'buyer' or 'seller'
+        count = request.args.get('count', 'exact', type=str)
         
         reviews_table = get_table('reviews')
         users_table = get_table('users')
         
         # Check if user exists
-        user_query = select(users_table).where(users_table.c.id == id)
-        user = execute_query(user_query, single_result=True)
+        user_query = _user_statements.get(
+            users_table, lambda: select(users_table.c.id).where(users_table.c.id == bindparam('user_id'))
+        )
+        user = db.session.execute(user_query, {"user_id": id}).first()
         
         if not user:
             return jsonify({"error": "User not found"}), 404
         
-        # Build query based on type filter
-        if type_filter == 'buyer':
-            query = select(reviews_table).where(reviews_table.c.buyer_id == id)
-        else:
-            query = select(reviews_table).where(reviews_table.c.seller_id == id)
-        
-        # Execute query
-        reviews = execute_query(query)
-        review_list = rows_to_list(reviews, reviews_table)
-        
-        # Apply pagination
-        paginated_reviews = paginate_results(review_list, page, limit)
+        # Build query based on type filter (one prebuilt statement per type)
+        user_column = 'buyer_id' if type_filter == 'buyer' else 'seller_id'
+        statements = _review_statements.get(
+            (reviews_table, user_column),
+            lambda: paged_statements(
+                select(reviews_table)
+                .where(reviews_table.c[user_column] == bindparam('user_id'))
+                .order_by(reviews_table.c.id)
+            )
+        )
         
-        return jsonify({
-            "page": page,
-            "per_page": limit,
-            "total": len(review_list),
-            "reviews": paginated_reviews
-        }), 200
+        # Fetch only the requested page, total comes from COUNT(*)
+        reviews, total = paginate_prepared(statements, {"user_id": id}, page, limit, count)
+        
+        # 304 if the client already has this page
+        return conditional_json(
+            lambda: {
+                "page": page,
+                "per_page": limit,
+                "total": total,
+                "reviews": rows_to_list(reviews, reviews_table)
+            },
+            list_etag('reviews', reviews, total)
+        )
         
     except Exception as e:
         return handle_error(e, "fetching user reviews")
@@ -306,6 +272,7 @@ def get_book_reviews(id):
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
+        count = request.args.get('count', 'exact', type=str)
         
         # Check if book exists
         books_table = get_table('books')
@@ -319,30 +286,32 @@ def get_book_reviews(id):
         reviews_table = get_table('reviews')
         
         # Query for reviews for this book
-        query = select(reviews_table).where(reviews_table.c.book_id == id)
+        query = select(reviews_table).where(
+            reviews_table.c.book_id == id
+        ).order_by(reviews_table.c.id)
             
-        # Execute query
-        reviews = execute_query(query)
+        # Fetch only the requested page, total comes from COUNT(*)
+        reviews, total = paginate_query(query, page, limit, count)
         
-        # Convert to list of dictionaries
-        review_list = rows_to_list(reviews, reviews_table)
-        
-        # Paginate results
-        paginated_reviews = paginate_results(review_list, page, limit)
+        def build_payload():
+            paginated_reviews = rows_to_list(reviews, reviews_table)
+            
+            # Get the buyer details for the whole page in one query (public fields only)
+            attach_related(
+                paginated_reviews, 'buyer_id', 'users', 'buyer',
+                columns=('id', 'name', 'last_name')
+            )
+            
+            return {
+                "page": page,
+                "total": total,
+                "reviews": paginated_reviews
+            }
         
-        # For each review, get the buyer details
-        users_table = get_table('users')
-        for review_dict in paginated_reviews:
-            # Get buyer info
-            buyer_query = select(users_table).where(users_table.c.id == review_dict['buyer_id'])
-            buyer = execute_query(buyer_query, single_result=True)
-            if buyer:
-                review_dict['buyer'] = row_to_dict(buyer, users_table)
+        # Embedded buyer names change without touching the reviews - their version is part of the ETag
+        buyers_version = rows_version('users', {review.buyer_id for review in reviews if review.buyer_id is not None})
         
-        return jsonify({
-            "page": page,
-            "total": len(review_list),
-            "reviews": paginated_reviews
-        }), 200
+        # 304 if the client already has this page
+        return conditional_json(build_payload, list_etag('reviews', reviews, total, related=buyers_version))
     except Exception as e:
         return handle_error(e, f"getting reviews for book {id}") 
\ No newline at end of file
@@ -2,12 +2,17 @@ from schemas.user_schema import user_schema, users_schema, UserSchema
 from models import db, User
 from flask import request, jsonify, Blueprint, current_app
 from marshmallow import ValidationError
-from sqlalchemy import select, or_, and_, desc, update, delete # to query the database
+from sqlalchemy import select, or_, and_, desc, update, delete, bindparam # to query the database
 from sqlalchemy.orm import selectinload
 from utils.db_helpers import (
-    get_table, row_to_dict, rows_to_list, paginate_results,
-    handle_error, execute_query, get_by_id
+    get_table, row_to_dict, rows_to_list, paginate_query, paginate_prepared,
+    handle_error, execute_query, get_by_id, attach_order_books, order_books_version
 )
+from utils.statement_cache import statement_cache, paged_statements
+from utils.http_cache import conditional_json, list_etag
+from utils.passwords import HashingBusyError
+from routes.auth_routes import busy_response
+from utils.token_versions import token_versions
 
 import jwt
 import datetime # to handle token expiration
@@ -15,6 +20,13 @@ import datetime # to handle token expiration
 # Define the Blueprint
 user_bp = Blueprint('user', __name__)
 
+# Prebuilt statements for GET /users/<id>/orders
+_user_statements = statement_cache('user_exists')
+_order_statements = statement_cache('user_orders')
+
+# Columns kept up to date by review writes, ignored in PUT /users/<id>
+SERVER_MAINTAINED_FIELDS = ('rating', 'rating_sum', 'rating_count')
+
 # ============ MARK: Post Methods ========
 
 @user_bp.route('/users', methods=['POST']) 
@@ -45,6 +57,9 @@ def create_user():
         
     except ValidationError as e:
         return jsonify(e.messages), 400
+    except HashingBusyError as he:
+        db.session.rollback()
+        return busy_response(he)
     except Exception as e:
         return jsonify({"error": "Something went wrong", "details": str(e)}), 500
     
@@ -75,6 +90,7 @@ def get_users():
         page = request.args.get('page', 1, type=int) 
         limit = request.args.get('limit', 10, type=int)
         search = request.args.get('search', type=str)
+        count = request.args.get('count', 'exact', type=str)
         
         # Debug message
         print("GET /users route called!")
@@ -96,23 +112,21 @@ def get_users():
                 )
             )
         
-        # Execute query
-        users = execute_query(query)
+        # Fetch only the requested page, total comes from COUNT(*)
+        users, total = paginate_query(query.order_by(users_table.c.id), page, limit, count)
         
-        # Convert to list of dictionaries
-        user_list = rows_to_list(users, users_table)
-        
-        if not user_list:
+        if total == 0 or (total is None and not users):
             return jsonify({"message": "No users found", "debug": "This is the updated route"}), 200 
         
-        # Paginate results
-        paginated_users = paginate_results(user_list, page, limit)
-        
-        return jsonify({
-            "page": page,
-            "total": len(user_list), 
-            "users": paginated_users
-        }), 200
+        # 304 if the client already has this page
+        return conditional_json(
+            lambda: {
+                "page": page,
+                "total": total, 
+                "users": rows_to_list(users, users_table)
+            },
+            list_etag('users', users, total)
+        )
     
     except Exception as e:
         return handle_error(e, "getting users")
@@ -164,6 +178,10 @@ def update_user(id):
         # Get the user data from the request
         data = request.json
         
+        # Rating and sales totals only change through reviews and orders - drop them
+        # so a client sending back a fetched user can't overwrite them
+        data = {key: value for key, value in data.items() if key not in SERVER_MAINTAINED_FIELDS}
+        
         # Validate using schema (partial update)
         try:
             # Validate data with marshmallow schema
@@ -180,6 +198,9 @@ def update_user(id):
         if not result:
             return jsonify({"error": "User not found"}), 404
         
+        # Tokens carry is_seller and stand in for the password - revoke the ones issued so far
+        revoke_tokens = 'password' in data or 'is_seller' in data
+        
         # Handle password separately if provided
         if 'password' in data:
             # We need to hash the password before updating
@@ -192,12 +213,21 @@ def update_user(id):
         if data:  # Only proceed if there are fields to update
             stmt = update(users_table).where(users_table.c.id == id).values(**data)
             db.session.execute(stmt)
+        
+        if revoke_tokens:
+            token_versions.bump(id)
             
         db.session.commit()
         
+        if revoke_tokens:
+            token_versions.forget(id)
+        
         # Get updated user
         return get_by_id('users', id)
         
+    except HashingBusyError as he:
+        db.session.rollback()
+        return busy_response(he)
     except Exception as e:
         db.session.rollback()
         return handle_error(e, "updating user")
@@ -235,11 +265,14 @@ def get_user_orders(user_id):
         status = request.args.get('status', type=str)
         sort = request.args.get('sort', 'order_date', type=str)
         order = request.args.get('order', 'desc', type=str)
+        count = request.args.get('count', 'exact', type=str)
         
         # Check if user exists
         users_table = get_table('users')
-        user_query = select(users_table).where(users_table.c.id == user_id)
-        user = execute_query(user_query, single_result=True)
+        user_query = _user_statements.get(
+            users_table, lambda: select(users_table.c.id).where(users_table.c.id == bindparam('user_id'))
+        )
+        user = db.session.execute(user_query, {"user_id": user_id}).first()
         
         if not user:
             return jsonify({"error": "User not found"}), 404
@@ -247,56 +280,54 @@ def get_user_orders(user_id):
         # Get orders table
         orders_table = get_table('orders')
         
-        # Build query to get orders for the user
-        query = select(orders_table).where(orders_table.c.user_id == user_id)
-        
-        # Apply status filter if provided
-        if status:
-            query = query.where(orders_table.c.status == status)
-        
         # Apply sorting
         if hasattr(orders_table.c, sort):
-            sort_column = getattr(orders_table.c, sort)
-            if order.lower() == 'desc':
-                query = query.order_by(desc(sort_column))
-            else:
-                query = query.order_by(sort_column)
+            descending = order.lower() == 'desc'
         else:
             # Default sort by order_date descending
-            query = query.order_by(desc(orders_table.c.order_date))
+            sort, descending = 'order_date', True
         
-        # Execute query
-        orders = execute_query(query)
-        
-        # Convert to list of dictionaries
-        order_list = rows_to_list(orders, orders_table)
+        def build():
+            # Build query to get orders for the user
+            query = select(orders_table).where(orders_table.c.user_id == bindparam('user_id'))
+            
+            # Apply status filter if provided
+            if status:
+                query = query.where(orders_table.c.status == bindparam('status'))
+            
+            sort_column = orders_table.c[sort]
+            if descending:
+                return paged_statements(query.order_by(desc(sort_column), desc(orders_table.c.id)))
+            return paged_statements(query.order_by(sort_column, orders_table.c.id))
+        
+        # One prebuilt statement per (status filter?, sort) shape
+        statements = _order_statements.get((orders_table, bool(status), sort, descending), build)
+        params = {"user_id": user_id}
+        if status:
+            params["status"] = status
         
-        # Paginate results
-        paginated_orders = paginate_results(order_list, page, limit)
+        # Fetch only the requested page, total comes from COUNT(*)
+        orders, total = paginate_prepared(statements, params, page, limit, count)
         
-        # For each order, get its books
-        for order_dict in paginated_orders:
-            # Get order_book junction table
-            order_book_table = get_table('order_book')
-            books_table = get_table('books')
+        def build_payload():
+            # Convert to list of dictionaries
+            paginated_orders = rows_to_list(orders, orders_table)
             
-            # Get books for this order
-            book_query = select(books_table).where(
-                books_table.c.id.in_(
-                    select(order_book_table.c.book_id).where(
-                        order_book_table.c.order_id == order_dict['id']
-                    )
-                )
-            )
-            books = execute_query(book_query)
-            order_dict['books'] = rows_to_list(books, books_table)
-        
-        return jsonify({
-            "page": page,
-            "limit": limit,
-            "total": len(order_list),
-            "orders": paginated_orders
-        }), 200
+            # Get the books of every order on the page in one query
+            attach_order_books(paginated_orders)
+            
+            return {
+                "page": page,
+                "limit": limit,
+                "total": total,
+                "orders": paginated_orders
+            }
+        
+        # 304 if neither the orders on the page nor their books changed
+        return conditional_json(
+            build_payload,
+            list_etag('orders', orders, total, related=order_books_version([order.id for order in orders]))
+        )
         
     except Exception as e:
         return handle_error(e, f"getting orders for user {user_id}")
\ No newline at end of file
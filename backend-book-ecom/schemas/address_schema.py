@@ -9,6 +9,7 @@ class AddressSchema(ma.SQLAlchemySchema):
         include_fk = True
 
     id = fields.Int(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
     street = fields.String(required=True)
     city = fields.String(required=True)
     state = fields.String(required=True)
@@ -8,6 +8,7 @@ class BookSchema(ma.SQLAlchemySchema):
         load_instance = True
         
     id = fields.Int(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
     title = fields.String(required=True)
     author = fields.String(required=True)
     price = fields.Float(required=True)
@@ -11,6 +11,7 @@ class OrderSchema(ma.SQLAlchemyAutoSchema):
         
     # Only include these by default
     id = fields.Int(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
     order_date = fields.DateTime(dump_only=True)
     total_amount = fields.Float(dump_only=True, required=True)
     status = fields.String(dump_only=True)
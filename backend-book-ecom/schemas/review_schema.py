@@ -8,6 +8,7 @@ class ReviewSchema(ma.SQLAlchemySchema):
         load_instance = True
 
     id = fields.Int(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
     rating = fields.Int(required=True)
     comment = fields.String()
     seller_id = fields.Int(required=True)
@@ -9,8 +9,10 @@ class UserSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = User # Connects the schema to the User model (Maps to User model)
         load_instance = True # Deserializes data directly into a User instance instead of just dictionary
+        exclude = ("token_version",) # internal - only used for token revocation
     
     id = fields.Int(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
     name = fields.String(required=True)
     last_name = fields.String(required=True)
     phone_number = fields.String(required=True)
@@ -18,7 +20,10 @@ class UserSchema(ma.SQLAlchemyAutoSchema):
     # Allows NULL passwords for guests - if notrhing None since "" still a securty issue 
     password = fields.String(load_only=True, allow_none=True) 
     is_seller = fields.Bool()
-    rating = fields.Float()
+    # Maintained by the server (review writes) - never taken from a request
+    rating = fields.Float(dump_only=True)
+    rating_sum = fields.Int(dump_only=True)
+    rating_count = fields.Int(dump_only=True)
     total_sales = fields.Int()
     # Dynamically include nested fields only if requested    
     orders = fields.Nested('OrderSchema', many=True, dump_only=True) # read only - only basic info is included by default 
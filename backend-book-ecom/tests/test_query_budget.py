@@ -0,0 +1,38 @@
+"""
+Statement budgets for the endpoints that used to run one query per row (N+1).
+
+Each page embeds related rows for every item on it - a budget independent of
+the page size fails as soon as one of them is loaded per row again.
+"""
+import pytest
+from sqlalchemy import text
+from models import db
+
+
+def test_book_reviews_load_buyers_in_one_query(client, query_budget, seed):
+    # book exists + page + COUNT(*) + buyers + ETag version of the buyers
+    with query_budget(5):
+        response = client.get(f"/books/1/reviews?limit={seed['buyers']}")
+
+    assert response.status_code == 200
+    reviews = response.get_json()["reviews"]
+    assert len(reviews) == seed["buyers"]
+    assert all(review["buyer"]["id"] == review["buyer_id"] for review in reviews)
+
+
+def test_user_orders_load_books_in_one_query(client, query_budget, seed):
+    # user exists + page + COUNT(*) + books of the page + ETag version of the books
+    with query_budget(5):
+        response = client.get(f"/user/2/orders?limit={seed['orders_per_buyer']}")
+
+    assert response.status_code == 200
+    orders = response.get_json()["orders"]
+    assert len(orders) == seed["orders_per_buyer"]
+    assert all(len(order["books"]) == seed["books_per_order"] for order in orders)
+
+
+def test_query_budget_reports_repeated_statements(app, query_budget):
+    with app.app_context(), pytest.raises(pytest.fail.Exception, match="3 SQL statements run, budget is 2"):
+        with query_budget(2):
+            for book_id in (1, 2, 3):
+                db.session.execute(text("SELECT title FROM books WHERE id = :id"), {"id": book_id})
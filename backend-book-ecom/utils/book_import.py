@@ -0,0 +1,291 @@
+"""
+Bulk book import from CSV or NDJSON.
+
+The file is read row by row, every row is validated against the Book
+constraints (required fields, price 0-10000, 13 character ISBN, publication
+year 1800-2100, column lengths, enum values) and valid rows are written in
+batches of BOOK_IMPORT_BATCH_SIZE with one executemany per batch, committed
+per batch.
+
+Rows with an ISBN are upserted on (seller_id, isbn), so importing the same file
+again updates the listings instead of duplicating them. The listing status is
+never overwritten by an import (a sold book stays sold). Rows without an ISBN
+are always inserted. MySQL, SQLite and PostgreSQL upsert in one statement; other
+databases look up the batch's existing ISBNs first, then run one UPDATE
+executemany and one INSERT executemany.
+
+Used by POST /books/import and `flask import-books`.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from sqlalchemy import insert, update, select, bindparam
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from models import db
+from utils.db_helpers import get_table
+
+BOOK_IMPORT_BATCH_SIZE = int(os.getenv('BOOK_IMPORT_BATCH_SIZE', 1000))
+# Errors kept in the report - the counts stay exact past this
+BOOK_IMPORT_MAX_ERRORS = int(os.getenv('BOOK_IMPORT_MAX_ERRORS', 1000))
+
+BOOK_CONDITIONS = {"New", "Like New", "Very Good", "Good", "Fair"}
+BOOK_STATUSES = {"Available", "Reserved", "Sold"}
+
+# Column -> max length
+TEXT_FIELDS = {
+    "title": 500,
+    "author": 255,
+    "description": 1000,
+    "genre": 100,
+    "image_url": 255
+}
+
+# Columns an import may (over)write on an existing listing
+UPSERT_FIELDS = (
+    "title", "author", "price", "description", "condition",
+    "genre", "publication_year", "image_url", "updated_at"
+)
+
+
+def read_rows(stream, file_format):
+    """Yield (row number, dict or None, error) from a binary stream of CSV or NDJSON"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        # Row 1 is the header
+        for number, row in enumerate(csv.DictReader(text), start=2):
+            yield number, row, None
+        return
+
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Each line must be a JSON object"
+            continue
+        yield number, row, None
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _text(field, max_length, required=False):
+    def clean(value):
+        if _blank(value):
+            if required:
+                raise ValueError(f"{field} is required")
+            return None
+        value = str(value).strip()
+        if len(value) > max_length:
+            raise ValueError(f"{field} is longer than {max_length} characters")
+        return value
+    return clean
+
+
+def _price(value):
+    if _blank(value):
+        raise ValueError("price is required")
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("price must be a number")
+    if not 0 <= price <= 10000:
+        raise ValueError("price must be between 0 and 10000")
+    return price
+
+
+def _isbn(value):
+    if _blank(value):
+        return None
+    isbn = str(value).strip().replace("-", "")
+    if len(isbn) != 13:
+        raise ValueError("isbn must be 13 characters")
+    return isbn
+
+
+def _publication_year(value):
+    if _blank(value):
+        return None
+    try:
+        year = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("publication_year must be an integer")
+    if not 1800 <= year <= 2100:
+        raise ValueError("publication_year must be between 1800 and 2100")
+    return year
+
+
+def _choice(field, choices):
+    def clean(value):
+        value = str(value).strip() if value is not None else None
+        if value not in choices:
+            raise ValueError(f"{field} must be one of {sorted(choices)}")
+        return value
+    return clean
+
+
+# Book column -> cleaner returning the value to store or raising ValueError with the message
+BOOK_FIELD_CLEANERS = {
+    "title": _text("title", TEXT_FIELDS["title"], required=True),
+    "author": _text("author", TEXT_FIELDS["author"], required=True),
+    "price": _price,
+    "description": _text("description", TEXT_FIELDS["description"]),
+    "condition": _choice("condition", BOOK_CONDITIONS),
+    "genre": _text("genre", TEXT_FIELDS["genre"]),
+    "publication_year": _publication_year,
+    "isbn": _isbn,
+    "image_url": _text("image_url", TEXT_FIELDS["image_url"]),
+    "status": _choice("status", BOOK_STATUSES)
+}
+
+
+def clean_book_fields(fields):
+    """Return (cleaned values, [error, ...]) for the book columns present in fields"""
+    values = {}
+    errors = []
+    for field, value in fields.items():
+        cleaner = BOOK_FIELD_CLEANERS.get(field)
+        if cleaner is None:
+            errors.append(f"{field} cannot be set")
+            continue
+        try:
+            values[field] = cleaner(value)
+        except ValueError as e:
+            errors.append(str(e))
+    return values, errors
+
+
+def validate_book_row(row, seller_id):
+    """Return (insert values, []) for a valid row or (None, [error, ...])"""
+    fields = {field: row.get(field) for field in BOOK_FIELD_CLEANERS}
+    if _blank(fields["condition"]):
+        fields["condition"] = "Good"
+    if _blank(fields["status"]):
+        fields["status"] = "Available"
+
+    values, errors = clean_book_fields(fields)
+    if errors:
+        return None, errors
+    values["seller_id"] = seller_id
+    values["updated_at"] = datetime.now()
+    return values, []
+
+
+def _upsert_statement(books_table):
+    """INSERT ... ON CONFLICT/DUPLICATE KEY UPDATE on (seller_id, isbn) for this dialect"""
+    dialect = db.engine.dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(books_table)
+        return stmt.on_duplicate_key_update({f: stmt.inserted[f] for f in UPSERT_FIELDS})
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(books_table)
+        return stmt.on_conflict_do_update(
+            index_elements=["seller_id", "isbn"],
+            set_={f: stmt.excluded[f] for f in UPSERT_FIELDS}
+        )
+    # No native upsert - _flush() splits the batch into updates and inserts
+    return None
+
+
+class BookImport:
+    """Validates and writes one import, collecting the per-row report"""
+
+    def __init__(self, seller_id, batch_size=None):
+        self.seller_id = seller_id
+        self.batch_size = batch_size or BOOK_IMPORT_BATCH_SIZE
+        self.books_table = get_table("books")
+        self.upsert = _upsert_statement(self.books_table)
+        self.insert = insert(self.books_table)
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = []
+
+    def _error(self, number, messages):
+        self.failed += 1
+        if len(self.errors) < BOOK_IMPORT_MAX_ERRORS:
+            self.errors.append({"row": number, "errors": messages})
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        with_isbn = [values for values in batch if values["isbn"] is not None]
+        without_isbn = [values for values in batch if values["isbn"] is None]
+        # One executemany per statement kind
+        if with_isbn and self.upsert is not None:
+            db.session.execute(self.upsert, with_isbn)
+        elif with_isbn:
+            self._update_or_insert(with_isbn)
+        if without_isbn:
+            db.session.execute(self.insert, without_isbn)
+        db.session.commit()
+        self.imported += len(batch)
+        self.batches += 1
+
+    def _update_or_insert(self, rows):
+        """Upsert on (seller_id, isbn) for databases without INSERT ... ON CONFLICT"""
+        books_table = self.books_table
+        # A later row for the same ISBN wins, as with the native upserts
+        by_isbn = {values["isbn"]: values for values in rows}
+        existing = set(db.session.execute(
+            select(books_table.c.isbn).where(
+                books_table.c.seller_id == self.seller_id,
+                books_table.c.isbn.in_(list(by_isbn))
+            )
+        ).scalars())
+
+        updates = [
+            dict({f"new_{f}": values[f] for f in UPSERT_FIELDS}, match_isbn=isbn)
+            for isbn, values in by_isbn.items() if isbn in existing
+        ]
+        if updates:
+            stmt = update(books_table).where(
+                books_table.c.seller_id == self.seller_id,
+                books_table.c.isbn == bindparam("match_isbn")
+            ).values({f: bindparam(f"new_{f}") for f in UPSERT_FIELDS})
+            db.session.execute(stmt, updates)
+
+        inserts = [values for isbn, values in by_isbn.items() if isbn not in existing]
+        if inserts:
+            db.session.execute(self.insert, inserts)
+
+    def run(self, rows):
+        """Import (row number, row, parse error) tuples from read_rows()"""
+        batch = []
+        try:
+            for number, row, parse_error in rows:
+                self.rows += 1
+                if parse_error:
+                    self._error(number, [parse_error])
+                    continue
+                values, errors = validate_book_row(row, self.seller_id)
+                if errors:
+                    self._error(number, errors)
+                    continue
+                batch.append(values)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+            self._flush(batch)
+        except Exception:
+            db.session.rollback()
+            raise
+        return self.report()
+
+    def report(self):
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "batches": self.batches,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
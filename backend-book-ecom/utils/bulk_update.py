@@ -0,0 +1,161 @@
+"""
+Set-based book updates for PATCH /books/bulk.
+
+Two request shapes turn into one UPDATE each, always limited to the seller's
+own books:
+
+    {"updates": [{"id": 1, "fields": {"price": 9.5}}, {"id": 2, "fields": {"status": "Sold"}}]}
+        -> UPDATE books SET price = CASE id WHEN 1 THEN 9.5 ELSE price END,
+                            status = CASE id WHEN 2 THEN 'Sold' ELSE status END
+           WHERE id IN (1, 2) AND seller_id = :seller
+
+    {"filter": {"condition": "Good"}, "patch": {"price": {"multiply": 0.9}}}
+        -> UPDATE books SET price = ROUND(price * 0.9, 2)
+           WHERE condition = 'Good' AND seller_id = :seller
+
+Field values go through the same cleaners as the bulk import
+(utils/book_import.py), so the book constraints are checked before any SQL runs.
+"""
+import os
+from numbers import Number
+from sqlalchemy import case, func, update
+from utils.book_import import clean_book_fields
+
+# Books per request in the {"updates": [...]} form - every book adds bind parameters to the CASEs
+BULK_UPDATE_MAX_BOOKS = int(os.getenv('BULK_UPDATE_MAX_BOOKS', 500))
+
+# Relative price changes: {"price": {"multiply": 0.9}} or {"price": {"add": -1}}
+PRICE_OPERATIONS = ("multiply", "add")
+
+# Columns the text search index is built from
+SEARCH_FIELDS = {"title", "author", "genre", "description"}
+
+
+def _is_number(value):
+    return isinstance(value, Number) and not isinstance(value, bool)
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _price_operation(books_table, operation):
+    """SQL expression for a relative price change, or raise ValueError"""
+    if not isinstance(operation, dict) or len(operation) != 1:
+        raise ValueError(f"price change must be one of {{'multiply': n}} or {{'add': n}}")
+    name, amount = next(iter(operation.items()))
+    if name not in PRICE_OPERATIONS or not _is_number(amount):
+        raise ValueError(f"price change must be one of {{'multiply': n}} or {{'add': n}}")
+    if name == "multiply":
+        if amount < 0:
+            raise ValueError("price multiplier cannot be negative")
+        return func.round(books_table.c.price * amount, 2)
+    return func.round(books_table.c.price + amount, 2)
+
+
+def patch_values(books_table, patch):
+    """Return (UPDATE values, errors) for a filter-plus-patch request"""
+    if not isinstance(patch, dict) or not patch:
+        return None, ["patch must be a non-empty object"]
+
+    errors = []
+    fields = dict(patch)
+    values = {}
+    if isinstance(fields.get("price"), dict):
+        try:
+            values["price"] = _price_operation(books_table, fields.pop("price"))
+        except ValueError as e:
+            errors.append(str(e))
+
+    cleaned, field_errors = clean_book_fields(fields)
+    errors.extend(field_errors)
+    values.update(cleaned)
+    return values, errors
+
+
+def filter_conditions(books_table, filters):
+    """Return (WHERE conditions, errors) for a filter-plus-patch request"""
+    if not isinstance(filters, dict):
+        return None, ["filter must be an object"]
+
+    conditions = []
+    errors = []
+    for key, value in filters.items():
+        if key == "ids":
+            if not isinstance(value, list) or not value or not all(_is_id(v) for v in value):
+                errors.append("ids must be a non-empty list of integers")
+            else:
+                conditions.append(books_table.c.id.in_(value))
+        elif key in ("status", "condition", "genre", "author"):
+            if not isinstance(value, str):
+                errors.append(f"{key} must be a string")
+            else:
+                conditions.append(books_table.c[key] == value)
+        elif key == "min_price":
+            if not _is_number(value):
+                errors.append("min_price must be a number")
+            else:
+                conditions.append(books_table.c.price >= value)
+        elif key == "max_price":
+            if not _is_number(value):
+                errors.append("max_price must be a number")
+            else:
+                conditions.append(books_table.c.price <= value)
+        else:
+            errors.append(f"cannot filter on {key}")
+    return conditions, errors
+
+
+def parse_updates(updates):
+    """Return ({book id: cleaned fields}, errors) for the {"updates": [...]} form"""
+    if not isinstance(updates, list) or not updates:
+        return None, ["updates must be a non-empty list"]
+    if len(updates) > BULK_UPDATE_MAX_BOOKS:
+        return None, [f"at most {BULK_UPDATE_MAX_BOOKS} books per request"]
+
+    changes = {}
+    errors = []
+    for index, item in enumerate(updates):
+        if not isinstance(item, dict) or not _is_id(item.get("id")):
+            errors.append({"index": index, "errors": ["each update needs an integer id"]})
+            continue
+        fields = item.get("fields")
+        if not isinstance(fields, dict) or not fields:
+            errors.append({"index": index, "id": item["id"], "errors": ["fields must be a non-empty object"]})
+            continue
+        if item["id"] in changes:
+            errors.append({"index": index, "id": item["id"], "errors": ["book listed twice"]})
+            continue
+        values, field_errors = clean_book_fields(fields)
+        if field_errors:
+            errors.append({"index": index, "id": item["id"], "errors": field_errors})
+            continue
+        changes[item["id"]] = values
+    return changes, errors
+
+
+def per_book_values(books_table, changes):
+    """UPDATE values setting each book's own fields: one CASE per column (a plain value when all books agree)"""
+    values = {}
+    fields = {field for book_fields in changes.values() for field in book_fields}
+    for field in sorted(fields):
+        per_book = {book_id: book_fields[field] for book_id, book_fields in changes.items() if field in book_fields}
+        distinct = set(per_book.values())
+        if len(per_book) == len(changes) and len(distinct) == 1:
+            values[field] = distinct.pop()
+        else:
+            values[field] = case(per_book, value=books_table.c.id, else_=books_table.c[field])
+    return values
+
+
+def bulk_update_statement(books_table, seller_id, values, conditions):
+    """UPDATE of the seller's books matching conditions"""
+    return (
+        update(books_table)
+        .where(books_table.c.seller_id == seller_id, *conditions)
+        .values(values)
+    )
+
+
+def touches_search_fields(fields):
+    return bool(SEARCH_FIELDS.intersection(fields))
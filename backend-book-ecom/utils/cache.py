@@ -0,0 +1,231 @@
+"""
+Small response caches for hot read endpoints.
+
+Each ResponseCache is a namespace of keys with a TTL and a size bound. Entries are
+never updated in place: writers call invalidate(), which bumps the namespace
+generation so every older entry is ignored from then on.
+
+Backends (CACHE_BACKEND):
+    - memory (default): per-process LRU dict with TTL
+    - redis: shared by every worker, needs the `redis` package and CACHE_REDIS_URL
+
+Generations live in the backend too, so an invalidate() only reaches the processes sharing
+it. With the memory backend a write handled by one worker (or by the flask import-books
+command) leaves every other worker serving its old entries until their TTL runs out -
+check_cache_backend() refuses that setup when WEB_CONCURRENCY says there are several workers.
+
+Values must be JSON serializable (the same data the endpoint passes to jsonify).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+
+class MemoryCacheBackend:
+    """Thread-safe LRU dict with a per-entry expiry time"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Cached value or None if missing/expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            # Drop least recently used entries beyond the bound
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, namespace):
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def bump_generation(self, namespace):
+        with self._lock:
+            generation = self._generations.get(namespace, 0) + 1
+            self._generations[namespace] = generation
+            # Entries of older generations can never be read again - free them now
+            prefix = f"{namespace}:"
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+            return generation
+
+    def size(self, namespace):
+        prefix = f"{namespace}:"
+        with self._lock:
+            return sum(1 for key in self._entries if key.startswith(prefix))
+
+
+class RedisCacheBackend:
+    """Redis backend - Redis handles expiry and eviction (configure maxmemory-policy)"""
+
+    def __init__(self, url, prefix="book-ecom"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        value = self._client.get(f"{self._prefix}:{key}")
+        return None if value is None else current_app.json.loads(value)
+
+    def set(self, key, value, ttl):
+        self._client.set(f"{self._prefix}:{key}", current_app.json.dumps(value), ex=max(int(ttl), 1))
+
+    def generation(self, namespace):
+        return int(self._client.get(f"{self._prefix}:{namespace}:generation") or 0)
+
+    def bump_generation(self, namespace):
+        return self._client.incr(f"{self._prefix}:{namespace}:generation")
+
+    def size(self, namespace):
+        return None
+
+
+def create_backend():
+    """Backend chosen by CACHE_BACKEND ('memory' or 'redis')"""
+    choice = os.getenv("CACHE_BACKEND", "memory")
+    if choice == "redis":
+        return RedisCacheBackend(os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+    return MemoryCacheBackend(int(os.getenv("CACHE_MAX_ENTRIES", 1024)))
+
+
+class ResponseCache:
+    """One cache namespace with TTL, generation-based invalidation and hit/miss counters"""
+
+    def __init__(self, namespace, ttl, backend=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "stale_stores": 0, "invalidations": 0}
+
+    @property
+    def backend(self):
+        # Created on first use so CACHE_* settings from .env are already loaded
+        if self._backend is None:
+            self._backend = shared_backend()
+        return self._backend
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_or_load(self, key, loader):
+        """Cached value for key, or loader() stored under the current generation"""
+        if self.ttl <= 0:
+            return loader()
+
+        backend = self.backend
+        generation = backend.generation(self.namespace)
+        full_key = f"{self.namespace}:{generation}:{key}"
+        value = backend.get(full_key)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        self._count("misses")
+        value = loader()
+        # A write that committed while loader() ran may not be in value - don't cache it
+        if backend.generation(self.namespace) == generation:
+            backend.set(full_key, value, self.ttl)
+            self._count("stores")
+        else:
+            self._count("stale_stores")
+        return value
+
+    def invalidate(self):
+        """Forget every cached entry of this namespace (call after the write is committed)"""
+        self.backend.bump_generation(self.namespace)
+        self._count("invalidations")
+
+    def stats(self):
+        backend = self.backend
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats.update(
+            ttl_seconds=self.ttl,
+            hit_ratio=round(stats["hits"] / lookups, 3) if lookups else None,
+            entries=backend.size(self.namespace),
+            generation=backend.generation(self.namespace)
+        )
+        return stats
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def shared_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+        return _backend
+
+
+def shares_invalidations():
+    """True when invalidate() reaches every process (the Redis backend)"""
+    return os.getenv("CACHE_BACKEND", "memory") == "redis"
+
+
+# GET /books/featured, keyed by limit
+featured_books_cache = ResponseCache("featured_books", float(os.getenv("FEATURED_CACHE_TTL", 30)))
+
+# GET /books/search, keyed by the canonicalized filters, sort and page
+search_results_cache = ResponseCache("search_results", float(os.getenv("SEARCH_CACHE_TTL", 60)))
+
+
+def invalidate_book_caches():
+    """Call after a committed write that changes books (or their status)"""
+    featured_books_cache.invalidate()
+    search_results_cache.invalidate()
+
+
+def check_cache_backend():
+    """Raise when several workers (WEB_CONCURRENCY) would each keep their own memory cache"""
+    workers = int(os.getenv("WEB_CONCURRENCY", 1))
+    caching = featured_books_cache.ttl > 0 or search_results_cache.ttl > 0
+    if workers > 1 and caching and not shares_invalidations():
+        raise RuntimeError(
+            f"WEB_CONCURRENCY={workers} needs CACHE_BACKEND=redis: the memory cache is per process and "
+            "writes would not invalidate the other workers' pages (or set FEATURED_CACHE_TTL=0 and SEARCH_CACHE_TTL=0)"
+        )
+
+
+def cache_stats():
+    """Counters exposed through the debug endpoint"""
+    backend = shared_backend()
+    return {
+        "backend": type(backend).__name__,
+        "evictions": backend.evictions,
+        "expirations": backend.expirations,
+        "featured_books": featured_books_cache.stats(),
+        "search_results": search_results_cache.stats()
+    }
@@ -1,33 +1,268 @@
 """
 Database helper functions to simplify SQL operations and standardize error handling
 """
-from flask import jsonify
-from sqlalchemy import Table, MetaData, select, insert
+import base64
+import binascii
+import json
+from flask import jsonify, request
+from sqlalchemy import select, insert, func, text, and_, or_, desc
+from sqlalchemy.exc import IntegrityError
 from models import db
+from utils.schema_registry import schema_registry
+from utils.http_cache import conditional_json, row_etag
+from utils.serialization import row_plan, encode_value
 
 def get_table(table_name):
-    """Create a SQLAlchemy Table object with autoload"""
-    metadata = MetaData()
-    return Table(table_name, metadata, autoload_with=db.engine)
+    """Get the reflected SQLAlchemy Table object from the shared schema registry"""
+    return schema_registry.get(table_name, db.engine)
 
 def row_to_dict(row, table):
-    """Convert a SQLAlchemy result row to a dictionary"""
+    """Convert a SQLAlchemy result row to a JSON-ready dictionary"""
     if not row:
         return None
-    result = {}
-    for column in table.columns:
-        result[column.name] = getattr(row, column.name)
-    return result
+    return row_plan(table).row(row)
 
 def rows_to_list(rows, table):
-    """Convert multiple SQLAlchemy result rows to a list of dictionaries"""
-    return [row_to_dict(row, table) for row in rows]
+    """Convert multiple SQLAlchemy result rows to a list of JSON-ready dictionaries"""
+    return row_plan(table).rows(rows)
 
-def paginate_results(results, page, limit):
-    """Paginate a list of results"""
-    start = (page - 1) * limit
-    end = start + limit
-    return results[start:end] if start < len(results) else []
+def attach_related(records, foreign_key, table_name, as_key, columns=None, match_column="id", many=False):
+    """
+    Attach related rows to a list of dicts in one IN (...) round trip instead of one query per record.
+    Each record gets record[as_key] = the row whose match_column equals record[foreign_key]
+    (a list of rows when many=True, None/[] when nothing matches).
+    columns limits the projection, e.g. only the public fields of a user.
+    """
+    keys = {record[foreign_key] for record in records if record.get(foreign_key) is not None}
+    related = {}
+    
+    if keys:
+        table = get_table(table_name)
+        names = list(columns) if columns else [column.name for column in table.columns]
+        selected = [table.c[name] for name in names]
+        if match_column not in names:
+            selected.append(table.c[match_column])
+        
+        plan = row_plan(table, names)
+        rows = db.session.execute(
+            select(*selected).where(table.c[match_column].in_(keys))
+        ).mappings()
+        for row in rows:
+            item = plan.from_mapping(row)
+            if many:
+                related.setdefault(row[match_column], []).append(item)
+            else:
+                related[row[match_column]] = item
+    
+    for record in records:
+        default = [] if many else None
+        record[as_key] = related.get(record.get(foreign_key), default)
+    return records
+
+def attach_order_books(orders, as_key="books"):
+    """
+    Attach the books of every order in one order_book JOIN books query,
+    grouped in memory by order id (orders with no books get an empty list).
+    Each book carries the unit_price snapshot stored on its line item.
+    """
+    order_ids = [order["id"] for order in orders]
+    books_by_order = {order_id: [] for order_id in order_ids}
+    
+    if order_ids:
+        order_book_table = get_table('order_book')
+        books_table = get_table('books')
+        query = select(
+            order_book_table.c.order_id.label("line_order_id"),
+            order_book_table.c.unit_price.label("line_unit_price"),
+            books_table
+        ).join(
+            books_table, books_table.c.id == order_book_table.c.book_id
+        ).where(
+            order_book_table.c.order_id.in_(order_ids)
+        ).order_by(order_book_table.c.order_id, books_table.c.id)
+        
+        plan = row_plan(books_table)
+        for row in db.session.execute(query).mappings():
+            book = plan.from_mapping(row)
+            book["unit_price"] = encode_value(row["line_unit_price"])
+            books_by_order[row["line_order_id"]].append(book)
+    
+    for order in orders:
+        order[as_key] = books_by_order[order["id"]]
+    return orders
+
+def order_books_version(order_ids):
+    """
+    (newest books.updated_at, line item count) over the books of the given orders -
+    the version of what attach_order_books() embeds, for ETags and Last-Modified.
+    """
+    if not order_ids:
+        return None, 0
+    order_book_table = get_table('order_book')
+    books_table = get_table('books')
+    query = select(
+        func.max(books_table.c.updated_at), func.count()
+    ).select_from(order_book_table).join(
+        books_table, books_table.c.id == order_book_table.c.book_id
+    ).where(order_book_table.c.order_id.in_(order_ids))
+    newest, lines = db.session.execute(query).one()
+    return newest, lines
+
+def rows_version(table_name, ids):
+    """Newest updated_at among the given rows - the version of rows embedded with attach_related()"""
+    if not ids:
+        return None
+    table = get_table(table_name)
+    return db.session.execute(
+        select(func.max(table.c.updated_at)).where(table.c.id.in_(ids))
+    ).scalar()
+
+def count_query(query, mode="exact"):
+    """
+    Count the rows a query would return.
+    mode: 'exact' runs COUNT(*), 'estimate' uses table statistics when the query
+    is an unfiltered single-table select (falls back to exact), 'none' skips it.
+    """
+    if mode == "none":
+        return None
+    if mode == "estimate":
+        estimate = estimate_count(query)
+        if estimate is not None:
+            return estimate
+    count_stmt = select(func.count()).select_from(query.order_by(None).subquery())
+    return db.session.execute(count_stmt).scalar()
+
+def estimate_count(query):
+    """Approximate row count from table statistics, or None when not available"""
+    froms = query.get_final_froms()
+    if query.whereclause is not None or len(froms) != 1 or not hasattr(froms[0], "name"):
+        return None
+    if db.engine.dialect.name != "mysql":
+        return None
+    stmt = text(
+        "SELECT TABLE_ROWS FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :name"
+    )
+    return db.session.execute(stmt, {"name": froms[0].name}).scalar()
+
+def paginate_query(query, page, limit, count="exact"):
+    """
+    Apply LIMIT/OFFSET to a query and count the total separately.
+    Returns (rows, total) - total is None when count='none'.
+    """
+    page = max(page, 1)
+    limit = max(limit, 0)
+    offset = (page - 1) * limit
+    rows = db.session.execute(query.limit(limit).offset(offset)).fetchall()
+    
+    # A short, non-empty page (or an empty first page) already tells us the total
+    if count != "none" and len(rows) < limit and (rows or offset == 0):
+        return rows, offset + len(rows)
+    
+    return rows, count_query(query, count)
+
+def paginate_prepared(statements, params, page, limit, count="exact"):
+    """
+    paginate_query() for prebuilt PagedStatements (utils/statement_cache.py):
+    params fill the statements' bindparams. Returns (rows, total).
+    """
+    page = max(page, 1)
+    limit = max(limit, 0)
+    offset = (page - 1) * limit
+    rows = db.session.execute(
+        statements.page, dict(params, page_limit=limit, page_offset=offset)
+    ).fetchall()
+    
+    # A short, non-empty page (or an empty first page) already tells us the total
+    if count != "none" and len(rows) < limit and (rows or offset == 0):
+        return rows, offset + len(rows)
+    if count == "none":
+        return rows, None
+    if count == "estimate":
+        estimate = estimate_count(statements.query)
+        if estimate is not None:
+            return rows, estimate
+    return rows, db.session.execute(statements.count, params).scalar()
+
+def encode_cursor(state):
+    """Encode keyset state as an opaque URL-safe token"""
+    raw = json.dumps(state, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Decode a token produced by encode_cursor - raises ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(state, dict) or "id" not in state:
+        raise ValueError("Invalid cursor")
+    return state
+
+def keyset_condition(sort_column, id_column, last_value, last_id, descending=False):
+    """
+    WHERE clause selecting the rows after (last_value, last_id) in sort order.
+    NULLs sort first in ascending and last in descending order (MySQL/SQLite behaviour).
+    """
+    if sort_column is id_column:
+        return id_column < last_id if descending else id_column > last_id
+    
+    if descending:
+        if last_value is None:
+            return and_(sort_column.is_(None), id_column < last_id)
+        return or_(
+            sort_column < last_value,
+            and_(sort_column == last_value, id_column < last_id),
+            sort_column.is_(None)
+        )
+    
+    if last_value is None:
+        return or_(
+            and_(sort_column.is_(None), id_column > last_id),
+            sort_column.is_not(None)
+        )
+    return or_(
+        sort_column > last_value,
+        and_(sort_column == last_value, id_column > last_id)
+    )
+
+def keyset_paginate(query, sort_column, id_column, cursor=None, limit=10, descending=False):
+    """
+    Cursor pagination: seek past the last row of the previous page instead of OFFSET,
+    so every page costs the same however deep it is.
+    Returns (rows, next_cursor) - next_cursor is None on the last page.
+    """
+    limit = max(limit, 1)
+    sort_key = {"sort": sort_column.name, "desc": descending}
+    
+    if cursor:
+        state = decode_cursor(cursor)
+        if state.get("sort") != sort_key["sort"] or state.get("desc") != descending:
+            raise ValueError("Cursor does not match the requested sort")
+        query = query.where(keyset_condition(
+            sort_column, id_column, state.get("value"), state["id"], descending
+        ))
+    
+    # id is the tie-breaker so rows with equal sort values are never skipped
+    if sort_column is id_column:
+        ordering = [desc(id_column) if descending else id_column]
+    elif descending:
+        ordering = [desc(sort_column), desc(id_column)]
+    else:
+        ordering = [sort_column, id_column]
+    
+    # Fetch one extra row to know whether there is a next page
+    rows = db.session.execute(query.order_by(*ordering).limit(limit + 1)).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    last = rows[-1]._mapping
+    next_cursor = encode_cursor(dict(
+        sort_key, value=last[sort_column], id=last[id_column]
+    ))
+    return rows, next_cursor
 
 def handle_error(e, operation="database operation"):
     """Handle exceptions with consistent logging and response format"""
@@ -58,6 +293,13 @@ def get_by_id(table_name, id, response=True):
             return None
             
         if response:
+            # GET answers carry ETag/Last-Modified and may be a 304
+            if request.method == 'GET':
+                return conditional_json(
+                    lambda: row_to_dict(result, table),
+                    row_etag(table_name, result),
+                    getattr(result, 'updated_at', None)
+                )
             return jsonify(row_to_dict(result, table)), 200
         return result, table
         
@@ -87,5 +329,9 @@ def create_record(table_name, data):
             table_name: data
         }), 201
         
+    except IntegrityError:
+        # Constraint violations are the caller's to report (duplicate -> 409, bad value -> 400)
+        db.session.rollback()
+        raise
     except Exception as e:
         return handle_error(e, f"creating {table_name}") 
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Conditional GET support (ETag / Last-Modified / 304 Not Modified).
+
+Every cached table has an updated_at row version (set on insert and on every UPDATE).
+Single records get an ETag from (id, updated_at); list pages from the ids in the
+window, the newest updated_at among them and the total. Responses embedding other
+rows (orders with ?include=books) fold those rows' version into the ETag as well.
+When the client's If-None-Match (or If-Modified-Since) still matches, a 304 is
+returned without serializing the rows.
+
+List pages send an ETag only, no Last-Modified: a row deleted from the window (or
+leaving it, like a cancelled order) doesn't change the newest updated_at, so an
+If-Modified-Since check would answer 304 for a page that did change.
+
+Cache-Control is configured per blueprint with CACHE_CONTROL_<BLUEPRINT>,
+e.g. CACHE_CONTROL_BOOK="public, max-age=60".
+"""
+import hashlib
+import os
+from datetime import timezone
+from flask import request, jsonify, make_response
+
+# Public catalog data may be cached by shared caches, account data only by the client
+DEFAULT_CACHE_CONTROL = {
+    "book": "public, max-age=0, must-revalidate",
+    "review": "public, max-age=0, must-revalidate",
+    "order": "private, no-cache",
+    "user": "private, no-cache",
+    "address": "private, no-cache"
+}
+
+
+def cache_control_for(blueprint):
+    """Cache-Control header value for a blueprint (env override first)"""
+    default = DEFAULT_CACHE_CONTROL.get(blueprint, "private, no-cache")
+    if not blueprint:
+        return default
+    return os.getenv(f"CACHE_CONTROL_{blueprint.upper()}", default)
+
+
+def _version(value):
+    return value.isoformat() if value is not None else ""
+
+
+def row_etag(table_name, row, related=None):
+    """ETag of one record (related: version of embedded rows, e.g. from order_books_version())"""
+    raw = f"{table_name}:{row.id}:{_version(getattr(row, 'updated_at', None))}"
+    if related is not None:
+        raw += f":{related}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def list_etag(table_name, rows, total=None, related=None):
+    """ETag of a list page: ids in the window, newest row version, the total and the embedded rows' version"""
+    versions = [row.updated_at for row in rows if getattr(row, "updated_at", None) is not None]
+    raw = "{}:{}:{}:{}:{}:{}".format(
+        table_name,
+        request.query_string.decode(),
+        ",".join(str(row.id) for row in rows),
+        _version(max(versions) if versions else None),
+        total,
+        related
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def records_etag(table_name, records, total=None):
+    """list_etag() for a page already turned into dicts (e.g. a cached payload)"""
+    raw = "{}:{}:{}:{}".format(
+        table_name,
+        request.query_string.decode(),
+        ",".join(f"{record['id']}@{record.get('updated_at')}" for record in records),
+        total
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def last_modified_of(rows, *related):
+    """Newest updated_at of the rows (and of the related timestamps given), or None"""
+    versions = [row.updated_at for row in rows if getattr(row, "updated_at", None) is not None]
+    versions.extend(value for value in related if value is not None)
+    return max(versions) if versions else None
+
+
+def _not_modified(etag, last_modified):
+    # If-None-Match wins over If-Modified-Since (RFC 9110)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        # HTTP dates have second resolution; naive datetimes are read as UTC (as werkzeug does)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def conditional_json(build_payload, etag, last_modified=None, status=200):
+    """
+    jsonify(build_payload()) with ETag, Last-Modified and Cache-Control headers,
+    or an empty 304 if the client's copy is still current (build_payload is not called).
+    """
+    if request.method in ("GET", "HEAD") and _not_modified(etag, last_modified):
+        response = make_response("", 304)
+    else:
+        response = make_response(jsonify(build_payload()), status)
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = cache_control_for(request.blueprint)
+    return response
@@ -0,0 +1,82 @@
+"""
+Password hashing with a configurable cost.
+
+PASSWORD_HASH_METHOD is any werkzeug method string, e.g. "scrypt:32768:8:1"
+(the default) or "pbkdf2:sha256:600000". The method and its parameters are
+stored in every hash, so old hashes keep verifying after the cost changes and
+needs_rehash() tells login to upgrade them.
+
+Hashing is deliberately slow, so it can run on a bounded worker pool
+(PASSWORD_HASH_WORKERS threads, at most PASSWORD_HASH_QUEUE waiting). When the
+pool is full HashingBusyError is raised and the route answers 429 instead of
+letting a login burst tie up every request thread.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+
+
+class HashingBusyError(Exception):
+    """Raised when the password hashing pool has no free slot"""
+
+
+class PasswordHasher:
+    """Hashes/verifies passwords inline or on a bounded thread pool"""
+
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=None, queue=None):
+        self.method = method
+        # "scrypt" and "scrypt:32768:8:1" produce the same prefix - compare what werkzeug writes
+        self.prefix = generate_password_hash("", method=method).split("$", 1)[0]
+        self.workers = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) if workers is None else workers
+        queue = int(os.getenv('PASSWORD_HASH_QUEUE', 16)) if queue is None else queue
+        self._pool = None
+        self._slots = None
+        if self.workers > 0:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            # Running + waiting jobs
+            self._slots = threading.BoundedSemaphore(self.workers + queue)
+        self._lock = threading.Lock()
+        self._stats = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected_busy": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _run(self, fn, *args):
+        if self._pool is None:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected_busy")
+            raise HashingBusyError("Too many password checks in progress, try again shortly")
+        try:
+            return self._pool.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        self._count("hashed")
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        if not stored_hash or password is None:
+            return False
+        self._count("verified")
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """True if the hash was made with another method or cost than the configured one"""
+        return bool(stored_hash) and stored_hash.split("$", 1)[0] != self.prefix
+
+    def record_rehash(self):
+        self._count("rehashed")
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, method=self.prefix, workers=self.workers)
+
+
+# Shared instance used by the auth routes and the User model
+password_hasher = PasswordHasher()
@@ -0,0 +1,129 @@
+"""
+Connection pool configuration and metrics.
+
+engine_options() turns the DB_POOL_* environment variables into
+SQLALCHEMY_ENGINE_OPTIONS. The pool is an InstrumentedQueuePool, which times how
+long each checkout waits for a free connection; pool events count new, closed
+and invalidated connections (churn). GET /metrics reports both together with the
+live pool state (checked out, overflow in use).
+"""
+import os
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    """Counters fed by pool events and InstrumentedQueuePool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engine = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {
+                "checkouts": 0,
+                "checkins": 0,
+                "connects": 0,
+                "closes": 0,
+                "invalidations": 0,
+                "timeouts": 0
+            }
+            self._waits = 0
+            self._wait_total = 0.0
+            self._wait_max = 0.0
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self._waits += 1
+            self._wait_total += seconds
+            self._wait_max = max(self._wait_max, seconds)
+            if timed_out:
+                self._counters["timeouts"] += 1
+
+    def install(self, engine):
+        """Listen to the engine's pool events (once per engine)"""
+        if self._engine is engine:
+            return
+        self._engine = engine
+        event.listen(engine, "connect", lambda *args: self._count("connects"))
+        event.listen(engine, "close", lambda *args: self._count("closes"))
+        event.listen(engine, "invalidate", lambda *args: self._count("invalidations"))
+        event.listen(engine, "checkout", lambda *args: self._count("checkouts"))
+        event.listen(engine, "checkin", lambda *args: self._count("checkins"))
+
+    def snapshot(self):
+        pool = self._engine.pool if self._engine is not None else None
+        with self._lock:
+            data = dict(self._counters)
+            data.update(
+                waits=self._waits,
+                wait_ms_total=round(self._wait_total * 1000, 3),
+                wait_ms_avg=round(self._wait_total * 1000 / self._waits, 3) if self._waits else None,
+                wait_ms_max=round(self._wait_max * 1000, 3)
+            )
+        # New + closed connections - high churn means pool_size/pool_recycle are too low
+        data["churn"] = data["connects"] + data["closes"] + data["invalidations"]
+        if pool is not None:
+            data["pool_class"] = type(pool).__name__
+            if isinstance(pool, QueuePool):
+                data.update(
+                    pool_size=pool.size(),
+                    checked_out=pool.checkedout(),
+                    checked_in=pool.checkedin(),
+                    overflow=max(pool.overflow(), 0),
+                    max_overflow=pool._max_overflow
+                )
+        return data
+
+
+# Shared instance used by InstrumentedQueuePool and GET /metrics
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def _env_flag(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def engine_options(database_uri):
+    """SQLALCHEMY_ENGINE_OPTIONS from DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_POOL_TIMEOUT"""
+    if not database_uri:
+        return {}
+    # In-memory SQLite needs its single shared connection - leave its pool alone
+    if database_uri == "sqlite://" or ":memory:" in database_uri or "mode=memory" in database_uri:
+        return {}
+
+    is_mysql = database_uri.startswith("mysql")
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+        # MySQL closes idle connections after wait_timeout (8h by default)
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 3600 if is_mysql else -1)),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", is_mysql),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30))
+    }
@@ -0,0 +1,38 @@
+"""
+pytest fixture asserting how many SQL statements an endpoint may run.
+
+Registered by the conftest.py next to app.py:
+
+    pytest_plugins = ["utils.pytest_query_budget"]
+
+and used in tests/test_query_budget.py:
+
+    def test_book_reviews_do_not_n_plus_one(client, query_budget):
+        with query_budget(3):
+            client.get("/books/1/reviews")
+
+The block fails with the statement count and the repeated fingerprints
+when the budget is exceeded.
+"""
+from contextlib import contextmanager
+import pytest
+from utils.query_stats import count_queries
+
+
+@contextmanager
+def _assert_query_budget(max_queries):
+    with count_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        repeated = "\n".join(f"    {n}x {sql}" for sql, n in stats.repeated())
+        pytest.fail(
+            f"{stats.count} SQL statements run, budget is {max_queries}"
+            + (f"\nRepeated statements:\n{repeated}" if repeated else ""),
+            pytrace=False
+        )
+
+
+@pytest.fixture
+def query_budget():
+    """Context manager factory: with query_budget(n): ... fails if more than n statements run"""
+    return _assert_query_budget
@@ -0,0 +1,153 @@
+"""
+Per-request SQL instrumentation.
+
+before_cursor_execute/after_cursor_execute listeners record every statement run
+while a Flask request is active: how many, total database time and how often
+each statement fingerprint (the SQL with literals and IN lists collapsed)
+repeats. A fingerprint seen many times in one request is the signature of an
+N+1 query.
+
+    - QUERY_BUDGET (default 25): log a warning for requests running more statements
+    - QUERY_STATS_HEADERS=1: add Server-Timing and X-Query-Count response headers
+    - QUERY_STATS=0: turn the instrumentation off
+
+count_queries() counts statements outside of requests (scripts, tests);
+utils/pytest_query_budget.py builds the query_budget pytest fixture on it.
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST_RE = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """Statement with literals, parameter lists and whitespace normalized"""
+    statement = _STRING_RE.sub("?", statement)
+    statement = _NUMBER_RE.sub("?", statement)
+    statement = _PARAM_LIST_RE.sub("(?)", statement)
+    return _SPACE_RE.sub(" ", statement).strip()
+
+
+class RequestQueryStats:
+    """Statements run by one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, minimum=2):
+        """[(fingerprint, times)] of statements run at least `minimum` times, most frequent first"""
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n >= minimum]
+
+
+# Active count_queries() blocks (any thread)
+_counters = []
+_counters_lock = threading.Lock()
+
+
+def _skipped(context):
+    # One-off work such as schema reflection runs with execution_options(query_stats=False)
+    return context is not None and context.execution_options.get("query_stats") is False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _skipped(context):
+        return
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _skipped(context):
+        return
+    started = conn.info["query_start"].pop()
+    duration = time.perf_counter() - started
+
+    if has_request_context():
+        stats = g.get("query_stats")
+        if stats is not None:
+            stats.record(statement, duration)
+    if _counters:
+        with _counters_lock:
+            for counter in _counters:
+                counter.record(statement, duration)
+
+
+def _handle_error(context):
+    # The statement failed - after_cursor_execute won't pop its start time
+    if _skipped(context.execution_context):
+        return
+    if context.connection is not None and context.connection.info.get("query_start"):
+        context.connection.info["query_start"].pop()
+
+
+def _install_listeners():
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def count_queries():
+    """Count the statements run inside the block: with count_queries() as stats: ... stats.count"""
+    _install_listeners()
+    stats = RequestQueryStats()
+    with _counters_lock:
+        _counters.append(stats)
+    try:
+        yield stats
+    finally:
+        with _counters_lock:
+            _counters.remove(stats)
+
+
+def init_query_stats(app):
+    """Install the engine listeners and the request hooks"""
+    if os.getenv("QUERY_STATS", "1") == "0":
+        return
+
+    budget = int(os.getenv("QUERY_BUDGET", 25))
+    headers = os.getenv("QUERY_STATS_HEADERS", "0") == "1"
+
+    _install_listeners()
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = RequestQueryStats()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.get("query_stats")
+        if stats is None:
+            return response
+
+        if stats.count > budget:
+            repeated = "; ".join(f"{n}x {sql[:120]}" for sql, n in stats.repeated()[:3])
+            app.logger.warning(
+                "%s %s ran %d SQL statements (budget %d, %.1fms)%s",
+                request.method, request.path, stats.count, budget, stats.duration * 1000,
+                f" - repeated: {repeated}" if repeated else ""
+            )
+
+        if headers:
+            response.headers["X-Query-Count"] = str(stats.count)
+            response.headers.add(
+                "Server-Timing", f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"'
+            )
+        return response
@@ -0,0 +1,168 @@
+"""
+Expiry sweeper for stale reservations.
+
+Orders that stay Pending/Unpaid longer than RESERVATION_TTL_MINUTES are cancelled and
+the books they reserved go back to Available. Work is done in batches: each batch picks
+the oldest expired orders through ix_orders_status_payment_created (no full scan of orders),
+cancels them and releases their books with two bulk UPDATEs, then commits.
+
+Run it once with `flask sweep-reservations`, or set RESERVATION_SWEEP_INTERVAL (seconds)
+to run it in a background thread inside the app.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, and_
+from models import db
+from utils.db_helpers import get_table
+from utils.cache import invalidate_book_caches
+
+
+class ReservationSweeper:
+    """Cancels expired Pending/Unpaid orders and releases their reserved books"""
+
+    def __init__(self):
+        self.ttl_minutes = float(os.getenv('RESERVATION_TTL_MINUTES', 30))
+        self.batch_size = int(os.getenv('RESERVATION_SWEEP_BATCH', 500))
+        self.interval = float(os.getenv('RESERVATION_SWEEP_INTERVAL', 0))
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {
+            "runs": 0,
+            "batches": 0,
+            "orders_cancelled": 0,
+            "books_released": 0,
+            "last_run_at": None,
+            "last_run_orders": 0,
+            "last_batch_ms": None,
+            "max_batch_ms": None,
+            "total_batch_ms": 0.0,
+            "errors": 0
+        }
+
+    def _sweep_batch(self, cutoff):
+        """Sweep one batch - returns (orders cancelled, books released)"""
+        orders_table = get_table('orders')
+        order_book_table = get_table('order_book')
+        books_table = get_table('books')
+
+        expired = and_(
+            orders_table.c.status == 'Pending',
+            orders_table.c.payment_status == 'Unpaid',
+            orders_table.c.created_at < cutoff
+        )
+
+        # Oldest expired orders first; SKIP LOCKED lets sweepers in several workers split the work
+        order_ids = db.session.execute(
+            select(orders_table.c.id).where(expired)
+            .order_by(orders_table.c.created_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not order_ids:
+            db.session.rollback()
+            return 0, 0
+
+        # Re-check the condition so an order paid in the meantime is left alone
+        cancelled = db.session.execute(
+            update(orders_table).where(
+                orders_table.c.id.in_(order_ids), expired
+            ).values(status='Cancelled')
+        ).rowcount
+
+        # Only books of orders that really got cancelled are released
+        released = db.session.execute(
+            update(books_table).where(
+                books_table.c.status == 'Reserved',
+                books_table.c.id.in_(
+                    select(order_book_table.c.book_id).join(
+                        orders_table, orders_table.c.id == order_book_table.c.order_id
+                    ).where(
+                        order_book_table.c.order_id.in_(order_ids),
+                        orders_table.c.status == 'Cancelled'
+                    )
+                )
+            ).values(status='Available')
+        ).rowcount
+
+        db.session.commit()
+        if released:
+            invalidate_book_caches()
+        return cancelled, released
+
+    def sweep(self):
+        """Sweep expired reservations in batches until none are left"""
+        cutoff = datetime.now() - timedelta(minutes=self.ttl_minutes)
+        run_orders = run_books = 0
+
+        while True:
+            started = time.perf_counter()
+            try:
+                cancelled, released = self._sweep_batch(cutoff)
+            except Exception as e:
+                db.session.rollback()
+                with self._lock:
+                    self._stats["errors"] += 1
+                print(f"Error during reservation sweep: {str(e)}")
+                raise
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            if not cancelled and not released:
+                break
+
+            run_orders += cancelled
+            run_books += released
+            with self._lock:
+                stats = self._stats
+                stats["batches"] += 1
+                stats["orders_cancelled"] += cancelled
+                stats["books_released"] += released
+                stats["last_batch_ms"] = round(elapsed_ms, 2)
+                stats["max_batch_ms"] = round(max(stats["max_batch_ms"] or 0, elapsed_ms), 2)
+                stats["total_batch_ms"] = round(stats["total_batch_ms"] + elapsed_ms, 2)
+            print(f"Reservation sweep batch: {cancelled} orders cancelled, {released} books released in {elapsed_ms:.1f}ms")
+
+            # A short batch means there is nothing more to pick up
+            if cancelled < self.batch_size:
+                break
+
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["last_run_at"] = datetime.now().isoformat()
+            self._stats["last_run_orders"] = run_orders
+        return run_orders, run_books
+
+    def start(self, app):
+        """Run sweep() every `interval` seconds in a daemon thread (no-op when interval is 0)"""
+        if self.interval <= 0 or self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.interval):
+                with app.app_context():
+                    try:
+                        self.sweep()
+                    except Exception:
+                        # Already counted and logged - try again on the next tick
+                        pass
+
+        self._thread = threading.Thread(target=run, name="reservation-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                ttl_minutes=self.ttl_minutes,
+                batch_size=self.batch_size,
+                interval_seconds=self.interval
+            )
+
+
+# Shared instance used by the CLI command, the background thread and the debug endpoint
+reservation_sweeper = ReservationSweeper()
@@ -0,0 +1,109 @@
+"""
+Process-wide registry of reflected tables.
+
+Reflecting a table costs several information-schema round trips, so the whole
+schema is reflected once (lazily, on first use) and the Table objects are shared
+by every request and worker thread. Call invalidate() after running migrations
+so the next lookup picks up the new schema.
+
+Reflection only sees the database schema, not Python-side defaults, so the
+updated_at row version column gets its insert/update default attached here.
+"""
+import threading
+from collections import defaultdict
+from datetime import datetime
+from flask import has_request_context, request
+from sqlalchemy import MetaData, Table, Column
+from models.base import UpdatedAt
+
+
+class SchemaRegistry:
+    """Thread-safe cache of reflected Table objects for one engine"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._engine = None
+        self._metadata = None
+        self._tables = {}
+        # Reflection calls per Flask endpoint (or "<no request>" for CLI/startup)
+        self._reflections = defaultdict(int)
+        self._hits = 0
+
+    def _record_reflection(self):
+        endpoint = request.endpoint if has_request_context() else None
+        self._reflections[endpoint or "<no request>"] += 1
+
+    def _add_row_version(self, table):
+        """Set updated_at on every Core insert/update of a reflected table"""
+        if "updated_at" in table.c:
+            Table(
+                table.name, table.metadata,
+                Column("updated_at", UpdatedAt, nullable=True, default=datetime.now, onupdate=datetime.now),
+                extend_existing=True
+            )
+        return table
+
+    def load(self, engine):
+        """Reflect every table of the database in one pass"""
+        with self._lock:
+            metadata = MetaData()
+            # Reflection is a one-off cost - keep it out of per-request query counts
+            with engine.connect() as conn:
+                metadata.reflect(bind=conn.execution_options(query_stats=False))
+            for table in metadata.tables.values():
+                self._add_row_version(table)
+            self._record_reflection()
+            self._engine = engine
+            self._metadata = metadata
+            self._tables = dict(metadata.tables)
+            return self._tables
+
+    def get(self, table_name, engine):
+        """Return the cached Table, reflecting only if it is not known yet"""
+        # Fast path: no lock needed for a dict read
+        table = self._tables.get(table_name)
+        if table is not None and self._engine is engine:
+            self._hits += 1
+            return table
+
+        with self._lock:
+            # Schema not loaded yet (or the app switched engines)
+            if self._metadata is None or self._engine is not engine:
+                self.load(engine)
+            table = self._tables.get(table_name)
+            if table is None:
+                # Table created after the last full reflection
+                with engine.connect() as conn:
+                    table = self._add_row_version(Table(
+                        table_name, self._metadata, autoload_with=conn.execution_options(query_stats=False)
+                    ))
+                self._record_reflection()
+                self._tables[table_name] = table
+            return table
+
+    def invalidate(self):
+        """Drop every cached table so the next lookup reflects again"""
+        with self._lock:
+            self._engine = None
+            self._metadata = None
+            self._tables = {}
+
+    def stats(self):
+        """Counters exposed through the debug endpoint"""
+        with self._lock:
+            return {
+                "loaded": self._metadata is not None,
+                "tables": sorted(self._tables),
+                "hits": self._hits,
+                "reflections": dict(self._reflections),
+                "total_reflections": sum(self._reflections.values())
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._reflections.clear()
+            self._hits = 0
+
+
+# Shared instance used by utils.db_helpers.get_table
+schema_registry = SchemaRegistry()
@@ -0,0 +1,58 @@
+"""
+Seller rating aggregates.
+
+users.rating_sum / users.rating_count are updated with O(1) arithmetic in the same
+transaction as the review write, and users.rating is derived from them in the same
+UPDATE statement. backfill_seller_ratings() rebuilds everything from the reviews table.
+"""
+from sqlalchemy import update, select, func, case, literal
+from models import db
+from utils.db_helpers import get_table
+
+def apply_rating_change(seller_id, rating_delta, count_delta):
+    """
+    Add rating_delta to the seller's rating sum and count_delta to the review count.
+    create: (rating, 1) - update: (new - old, 0) - delete: (-rating, -1)
+    """
+    users_table = get_table('users')
+    new_sum = users_table.c.rating_sum + rating_delta
+    new_count = users_table.c.rating_count + count_delta
+    
+    # rating is assigned first and only reads the old sum/count, so the result is the same
+    # on databases that evaluate SET left-to-right with new values (MySQL) and those that don't
+    stmt = update(users_table).where(
+        users_table.c.id == seller_id
+    ).ordered_values(
+        (users_table.c.rating, case(
+            (new_count > 0, new_sum * literal(1.0) / new_count),
+            else_=0
+        )),
+        (users_table.c.rating_sum, new_sum),
+        (users_table.c.rating_count, new_count)
+    )
+    db.session.execute(stmt)
+
+def backfill_seller_ratings():
+    """Rebuild rating_sum, rating_count and rating for every user from the reviews table"""
+    users_table = get_table('users')
+    reviews_table = get_table('reviews')
+    
+    rating_sum = select(func.coalesce(func.sum(reviews_table.c.rating), 0)).where(
+        reviews_table.c.seller_id == users_table.c.id
+    ).scalar_subquery()
+    rating_count = select(func.count()).where(
+        reviews_table.c.seller_id == users_table.c.id
+    ).scalar_subquery()
+    
+    result = db.session.execute(
+        update(users_table).values(rating_sum=rating_sum, rating_count=rating_count)
+    )
+    
+    # Separate statement so the average reads the rebuilt totals on every database
+    db.session.execute(update(users_table).values(rating=case(
+        (users_table.c.rating_count > 0, users_table.c.rating_sum * literal(1.0) / users_table.c.rating_count),
+        (users_table.c.rating.is_(None), None),
+        else_=0
+    )))
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,174 @@
+"""
+Row serialization for JSON responses.
+
+Each table gets a RowPlan once: the column names in order and an encoder for
+the few columns whose values JSON can't carry as they are - dates and datetimes
+(HTTP date, as Flask's jsonify writes them), Decimal (string) and Python Enum
+values. Converting a row is then one dict(zip(...)) over the row tuple plus
+those encoders, and the dicts hold only plain JSON types, so the JSON encoder
+never falls back to its default() hook.
+
+JSON_BACKEND picks the response encoder:
+    - auto (default): orjson when it is installed, otherwise the stdlib json module
+    - orjson / stdlib: force one
+"""
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import types
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("", "Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _encode_date(value):
+    # Naive datetimes (what the database returns) formatted directly - same text as http_date(), a few times faster
+    if type(value) is datetime and value.tzinfo is None:
+        return (
+            f"{_WEEKDAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month]} {value.year:04d} "
+            f"{value.hour:02d}:{value.minute:02d}:{value.second:02d} GMT"
+        )
+    return http_date(value) if isinstance(value, date) else value
+
+
+def _encode_decimal(value):
+    return str(value) if isinstance(value, Decimal) else value
+
+
+def _encode_enum(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+def encode_value(value):
+    """JSON-ready form of a single value whose column type is not known"""
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def column_encoder(column):
+    """Encoder for one column's values, or None when they are JSON-ready already"""
+    column_type = column.type
+    if isinstance(column_type, (types.DateTime, types.Date)):
+        return _encode_date
+    if isinstance(column_type, types.Numeric) and column_type.asdecimal:
+        return _encode_decimal
+    if isinstance(column_type, types.Enum) and column_type.enum_class is not None:
+        return _encode_enum
+    return None
+
+
+class RowPlan:
+    """Precomputed column names and encoders of one table (or a subset of its columns)"""
+
+    __slots__ = ("names", "encoders")
+
+    def __init__(self, table, names=None):
+        columns = [table.c[name] for name in names] if names else list(table.columns)
+        self.names = tuple(column.name for column in columns)
+        self.encoders = tuple(
+            (column.name, encoder)
+            for column in columns
+            if (encoder := column_encoder(column)) is not None
+        )
+
+    def _encode(self, record):
+        for name, encoder in self.encoders:
+            value = record[name]
+            if value is not None:
+                record[name] = encoder(value)
+        return record
+
+    def from_mapping(self, mapping):
+        """Dict of the plan's columns from a row._mapping / result.mappings() row"""
+        return self._encode({name: mapping[name] for name in self.names})
+
+    def row(self, row):
+        # select(table) rows hold exactly the plan's columns in order - zip the tuple
+        if row._fields == self.names:
+            return self._encode(dict(zip(self.names, row)))
+        return self.from_mapping(row._mapping)
+
+    def rows(self, rows):
+        rows = list(rows)
+        if not rows:
+            return []
+        names = self.names
+        if rows[0]._fields != names:
+            return [self.from_mapping(row._mapping) for row in rows]
+        records = [dict(zip(names, row)) for row in rows]
+        if self.encoders:
+            for record in records:
+                self._encode(record)
+        return records
+
+
+_plans = {}
+
+
+def row_plan(table, names=None):
+    """Shared RowPlan for a table (and column subset)"""
+    key = (table, tuple(names) if names else None)
+    plan = _plans.get(key)
+    if plan is None:
+        plan = _plans.setdefault(key, RowPlan(table, names))
+    return plan
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider writing responses with orjson (same sorted keys and date format as the default)"""
+
+    # Dates go through default() so they keep jsonify's HTTP date format
+    options = (
+        (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+         | orjson.OPT_PASSTHROUGH_DATACLASS)
+        if orjson is not None else 0
+    )
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.options).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self.options
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=options), mimetype=self.mimetype
+        )
+
+
+def json_backend():
+    """'orjson' or 'stdlib' from JSON_BACKEND"""
+    choice = os.getenv("JSON_BACKEND", "auto")
+    if choice == "orjson" or (choice == "auto" and orjson is not None):
+        if orjson is None:
+            raise RuntimeError("JSON_BACKEND=orjson needs the orjson package (pip install orjson)")
+        return "orjson"
+    return "stdlib"
+
+
+def init_json(app):
+    """Install the JSON_BACKEND provider on the app"""
+    if json_backend() == "orjson":
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,99 @@
+"""
+Prebuilt statements for the fixed-shape list queries.
+
+The list endpoints (GET /books, GET /books/search, GET /users/<id>/orders,
+GET /users/<id>/reviews) used to build a new select() graph on every request,
+and SQLAlchemy had to walk it again to find the compiled SQL in its cache.
+Here the statements are built once per shape - which optional filters are
+present, the sort - with bindparam() placeholders for every value, LIMIT and
+OFFSET included. A repeat request is a dict lookup; the same Select object is
+executed with new parameters, so its compiled-cache key is memoized too.
+
+    STATEMENT_CACHE_SIZE (default 512): shapes kept per cache (LRU)
+    STATEMENT_CACHE=0: build every statement per request (for benchmarks)
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+from sqlalchemy import Integer, bindparam, func, select
+from sqlalchemy.sql import Select
+
+STATEMENT_CACHE_SIZE = int(os.getenv('STATEMENT_CACHE_SIZE', 512))
+
+
+class PagedStatements(NamedTuple):
+    """Statements for one query shape; execute with paginate_prepared()"""
+    query: Select   # unpaged query (ORDER BY included)
+    page: Select    # query + LIMIT :page_limit OFFSET :page_offset
+    count: Select   # COUNT(*) over the query
+
+
+def paged_statements(query):
+    """PagedStatements for a query whose values are all bindparam()s"""
+    return PagedStatements(
+        query,
+        query.limit(bindparam('page_limit', type_=Integer)).offset(bindparam('page_offset', type_=Integer)),
+        select(func.count()).select_from(query.order_by(None).subquery())
+    )
+
+
+class StatementCache:
+    """Statements keyed by query shape, with hit/miss counters"""
+
+    # Flipped off by bench_statements.py to measure the uncached path
+    enabled = os.getenv('STATEMENT_CACHE', '1') != '0'
+
+    def __init__(self, name, maxsize=STATEMENT_CACHE_SIZE):
+        self.name = name
+        self.maxsize = maxsize
+        self._statements = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        """Statement for key, built with build() the first time the shape is seen"""
+        if not self.enabled:
+            return build()
+        with self._lock:
+            statement = self._statements.get(key)
+            if statement is not None:
+                self._statements.move_to_end(key)
+                self.hits += 1
+                return statement
+            self.misses += 1
+        # Built outside the lock - two threads racing on a new shape both build it, one wins
+        statement = build()
+        with self._lock:
+            self._statements[key] = statement
+            while len(self._statements) > self.maxsize:
+                self._statements.popitem(last=False)
+        return statement
+
+    def clear(self):
+        with self._lock:
+            self._statements.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "shapes": len(self._statements),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+_caches = {}
+
+
+def statement_cache(name):
+    """Shared StatementCache for name (one per query family)"""
+    cache = _caches.get(name)
+    if cache is None:
+        cache = _caches.setdefault(name, StatementCache(name))
+    return cache
+
+
+def statement_cache_stats():
+    return {name: cache.stats() for name, cache in _caches.items()}
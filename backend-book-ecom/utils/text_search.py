@@ -0,0 +1,328 @@
+"""
+Full-text search over book text fields (title, author, genre, description).
+
+Two backends share one interface:
+    - FulltextBookSearch: MySQL FULLTEXT index queried with MATCH ... AGAINST
+    - MemoryBookSearch: in-process inverted index for databases without one (SQLite in development)
+
+The in-process index is built lazily from the books table on the first search and is kept
+up to date incrementally by create_book, update_book and delete_book through refresh()/remove().
+Both backends match every query word as a prefix ("dun" finds "Dune") and rank by relevance.
+
+The in-process index lives in one worker's memory: refresh()/remove()/invalidate() only reach
+the worker that handled the write, and other workers keep serving their own copy until they
+restart. Use it for single-process deployments (the development server); run several workers
+on MySQL with the FULLTEXT backend.
+
+Matching ids reach SQL in bounded IN lists: both filter() and paginate_by_relevance() check the
+ranked ids against the query's other filters SEARCH_ID_CHUNK at a time. filter() then hands the
+surviving ids to the caller's query in one IN list, so it raises SearchTooBroadError when more than
+SEARCH_MAX_MATCHES books survive instead of dropping any (sort_by=relevance has no such limit).
+"""
+import bisect
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+from sqlalchemy import select, desc, false
+from sqlalchemy.dialects.mysql import match
+from models import db
+from utils.db_helpers import paginate_query
+
+# Indexed columns and their weight in the relevance score
+BOOK_TEXT_FIELDS = {
+    "title": 3.0,
+    "author": 2.0,
+    "genre": 1.5,
+    "description": 1.0
+}
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Most matching ids filter() puts in one IN list - the best-scoring ones are kept
+SEARCH_MAX_MATCHES = int(os.getenv("SEARCH_MAX_MATCHES", 1000))
+# Ids per IN list when relevance paging checks matches against the other filters
+SEARCH_ID_CHUNK = int(os.getenv("SEARCH_ID_CHUNK", 500))
+
+
+class SearchTooBroadError(ValueError):
+    """The search term and filters match more books than filter() puts in one IN list"""
+
+
+def tokenize(text):
+    """Lower-case word tokens of a text value"""
+    if not text:
+        return []
+    return TOKEN_RE.findall(str(text).lower())
+
+
+class MemoryBookSearch:
+    """In-process inverted index: token -> {book_id: weighted term frequency}"""
+
+    name = "memory"
+
+    def __init__(self, fields=BOOK_TEXT_FIELDS):
+        self.fields = fields
+        self._lock = threading.RLock()
+        self._engine = None
+        self._postings = defaultdict(dict)
+        self._doc_tokens = {}
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+
+    # ---- index maintenance
+
+    def _index_row(self, row):
+        """Add one book row (mapping with id + text fields) to the index"""
+        weights = defaultdict(float)
+        for field, weight in self.fields.items():
+            for token in tokenize(row.get(field)):
+                weights[token] += weight
+        for token, weight in weights.items():
+            if token not in self._postings:
+                self._vocabulary_dirty = True
+            self._postings[token][row["id"]] = weight
+        self._doc_tokens[row["id"]] = set(weights)
+
+    def _unindex(self, book_id):
+        for token in self._doc_tokens.pop(book_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(book_id, None)
+            if not postings:
+                del self._postings[token]
+                self._vocabulary_dirty = True
+
+    def _select_text(self, books_table):
+        return select(books_table.c.id, *[books_table.c[f] for f in self.fields])
+
+    def build(self, books_table):
+        """(Re)build the whole index from the books table"""
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._doc_tokens = {}
+            result = db.session.execute(
+                self._select_text(books_table).execution_options(yield_per=1000)
+            )
+            for row in result.mappings():
+                self._index_row(row)
+            self._vocabulary_dirty = True
+            self._engine = db.engine
+
+    def _ensure_built(self, books_table):
+        if self._engine is not db.engine:
+            self.build(books_table)
+
+    def refresh(self, books_table, book_id):
+        """Re-index one book after it was created or updated"""
+        with self._lock:
+            # Nothing to maintain until the first search builds the index
+            if self._engine is not db.engine:
+                return
+            row = db.session.execute(
+                self._select_text(books_table).where(books_table.c.id == book_id)
+            ).mappings().first()
+            self._unindex(book_id)
+            if row:
+                self._index_row(row)
+
+    def remove(self, books_table, book_id):
+        """Drop a deleted book from the index"""
+        with self._lock:
+            self._unindex(book_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._engine = None
+            self._postings = defaultdict(dict)
+            self._doc_tokens = {}
+            self._vocabulary = []
+
+    # ---- querying
+
+    def _expand(self, prefix):
+        """All indexed tokens starting with prefix (sorted vocabulary + bisect)"""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        matches = []
+        for token in self._vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            matches.append(token)
+        return matches
+
+    def scores(self, books_table, term):
+        """{book_id: relevance} for books matching every word of term, None if term has no words"""
+        words = tokenize(term)
+        if not words:
+            return None
+        with self._lock:
+            self._ensure_built(books_table)
+            total_docs = max(len(self._doc_tokens), 1)
+            result = None
+            for word in words:
+                word_scores = defaultdict(float)
+                for token in self._expand(word):
+                    postings = self._postings[token]
+                    idf = math.log(1 + total_docs / len(postings))
+                    for book_id, weight in postings.items():
+                        word_scores[book_id] += weight * idf
+                if result is None:
+                    result = dict(word_scores)
+                else:
+                    # AND semantics - keep only books matching all words so far
+                    result = {
+                        book_id: score + word_scores[book_id]
+                        for book_id, score in result.items()
+                        if book_id in word_scores
+                    }
+                if not result:
+                    break
+            return result
+
+    @staticmethod
+    def _ranked(scores):
+        """Matching ids, best score first (newest first among equal scores)"""
+        return sorted(scores, key=lambda book_id: (scores[book_id], book_id), reverse=True)
+
+    def _matching_ids(self, query, books_table, ranked):
+        """Ranked ids that also pass the query's own filters, checked one chunk at a time"""
+        id_query = query.with_only_columns(books_table.c.id).order_by(None)
+        for offset in range(0, len(ranked), SEARCH_ID_CHUNK):
+            chunk = ranked[offset:offset + SEARCH_ID_CHUNK]
+            found = set(db.session.execute(id_query.where(books_table.c.id.in_(chunk))).scalars())
+            yield from (book_id for book_id in chunk if book_id in found)
+
+    def filter(self, query, books_table, term):
+        """Restrict a books query to rows matching term (SearchTooBroadError past SEARCH_MAX_MATCHES)"""
+        scores = self.scores(books_table, term)
+        if scores is None:
+            return query
+        if not scores:
+            return query.where(false())
+        ids = list(scores)
+        if len(ids) > SEARCH_MAX_MATCHES:
+            # Too many for one IN list - the other filters may narrow them down, checked in chunks
+            ids = []
+            for book_id in self._matching_ids(query, books_table, self._ranked(scores)):
+                ids.append(book_id)
+                if len(ids) > SEARCH_MAX_MATCHES:
+                    raise SearchTooBroadError(
+                        f"Search matches more than {SEARCH_MAX_MATCHES} books - "
+                        "add words or filters, or use /books/search?sort_by=relevance"
+                    )
+            if not ids:
+                return query.where(false())
+        return query.where(books_table.c.id.in_(ids))
+
+    def paginate_by_relevance(self, query, books_table, term, page, limit, count="exact"):
+        """Page of rows ordered by relevance (best first), plus the total match count"""
+        scores = self.scores(books_table, term)
+        if scores is None:
+            return paginate_query(query.order_by(desc(books_table.c.id)), page, limit, count)
+        if not scores:
+            return [], 0
+
+        start = (max(page, 1) - 1) * max(limit, 0)
+        end = start + max(limit, 0)
+
+        # Other filters still run in SQL; without a count the walk stops as soon as the page is full
+        ids = []
+        for book_id in self._matching_ids(query, books_table, self._ranked(scores)):
+            ids.append(book_id)
+            if count == "none" and len(ids) >= end:
+                break
+        total = None if count == "none" else len(ids)
+
+        page_ids = ids[start:end]
+        if not page_ids:
+            return [], total
+
+        rows = db.session.execute(
+            select(books_table).where(books_table.c.id.in_(page_ids))
+        ).fetchall()
+        position = {book_id: i for i, book_id in enumerate(page_ids)}
+        rows.sort(key=lambda row: position[row.id])
+        return rows, total
+
+
+class FulltextBookSearch:
+    """MySQL FULLTEXT index (ix_books_fulltext) queried in boolean mode"""
+
+    name = "fulltext"
+
+    def __init__(self, fields=BOOK_TEXT_FIELDS):
+        self.fields = fields
+
+    def _match(self, books_table, term):
+        words = tokenize(term)
+        if not words:
+            return None
+        # +word* -> every word required, matched as a prefix
+        against = " ".join(f"+{word}*" for word in words)
+        return match(*[books_table.c[f] for f in self.fields], against=against).in_boolean_mode()
+
+    # The database maintains the index itself
+    def refresh(self, books_table, book_id):
+        pass
+
+    def remove(self, books_table, book_id):
+        pass
+
+    def invalidate(self):
+        pass
+
+    def filter(self, query, books_table, term):
+        clause = self._match(books_table, term)
+        return query if clause is None else query.where(clause)
+
+    def paginate_by_relevance(self, query, books_table, term, page, limit, count="exact"):
+        clause = self._match(books_table, term)
+        if clause is None:
+            return paginate_query(query.order_by(desc(books_table.c.id)), page, limit, count)
+        return paginate_query(
+            query.where(clause).order_by(desc(clause), desc(books_table.c.id)), page, limit, count
+        )
+
+
+class BookSearch:
+    """
+    Picks the backend from BOOK_SEARCH_BACKEND ('auto', 'fulltext' or 'memory').
+    'auto' uses FULLTEXT on MySQL and the in-process index everywhere else.
+    """
+
+    def __init__(self):
+        self._memory = MemoryBookSearch()
+        self._fulltext = FulltextBookSearch()
+
+    @property
+    def backend(self):
+        choice = os.getenv("BOOK_SEARCH_BACKEND", "auto")
+        if choice == "memory":
+            return self._memory
+        if choice == "fulltext" or db.engine.dialect.name == "mysql":
+            return self._fulltext
+        return self._memory
+
+    def filter(self, query, books_table, term):
+        return self.backend.filter(query, books_table, term)
+
+    def paginate_by_relevance(self, query, books_table, term, page, limit, count="exact"):
+        return self.backend.paginate_by_relevance(query, books_table, term, page, limit, count)
+
+    def refresh(self, books_table, book_id):
+        self.backend.refresh(books_table, book_id)
+
+    def remove(self, books_table, book_id):
+        self.backend.remove(books_table, book_id)
+
+    def invalidate(self):
+        self._memory.invalidate()
+
+
+# Shared instance used by the book routes
+book_search = BookSearch()
@@ -0,0 +1,75 @@
+"""
+In-process cache of users.token_version for stateless JWT revocation.
+
+Tokens carry the user's token_version as the `ver` claim. Bumping the column
+(password reset, POST /auth/revoke) invalidates every older token. token_required
+checks the claim against this cache, so an authenticated request costs at most
+one primary-key lookup per user every TOKEN_VERSION_TTL seconds instead of
+loading the full User row each time. Revocations made in this process take
+effect immediately; other workers pick them up within the TTL.
+"""
+import os
+import threading
+import time
+from sqlalchemy import select, update
+from models import db
+from utils.db_helpers import get_table
+
+
+class TokenVersionCache:
+    """user_id -> (token_version, fetched_at), refreshed after ttl seconds"""
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = float(os.getenv('TOKEN_VERSION_TTL', 60)) if ttl is None else ttl
+        self.max_entries = int(os.getenv('TOKEN_VERSION_CACHE_SIZE', 100000)) if max_entries is None else max_entries
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._stats = {"hits": 0, "lookups": 0}
+
+    def get(self, user_id):
+        """Current token_version of a user, None if the user doesn't exist"""
+        now = time.monotonic()
+        entry = self._versions.get(user_id)
+        if entry is not None and now - entry[1] < self.ttl:
+            with self._lock:
+                self._stats["hits"] += 1
+            return entry[0]
+
+        users_table = get_table('users')
+        version = db.session.execute(
+            select(users_table.c.token_version).where(users_table.c.id == user_id)
+        ).scalar()
+        with self._lock:
+            self._stats["lookups"] += 1
+            if len(self._versions) >= self.max_entries:
+                self._versions.clear()
+            self._versions[user_id] = (version, now)
+        return version
+
+    def bump(self, user_id):
+        """Revoke every token issued to a user so far - commit, then call forget()"""
+        users_table = get_table('users')
+        db.session.execute(
+            update(users_table).where(users_table.c.id == user_id).values(
+                token_version=users_table.c.token_version + 1
+            )
+        )
+
+    def forget(self, user_id):
+        """Drop the cached version so the next check reads the committed one"""
+        with self._lock:
+            self._versions.pop(user_id, None)
+
+    def reset(self):
+        """Empty the cache and the counters"""
+        with self._lock:
+            self._versions.clear()
+            self._stats = {"hits": 0, "lookups": 0}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._versions), ttl_seconds=self.ttl)
+
+
+# Shared instance used by token_required
+token_versions = TokenVersionCache()